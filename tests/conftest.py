@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Run headless and import trash_trouble.py from the repository root
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
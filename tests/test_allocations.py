@@ -0,0 +1,57 @@
+import random
+import tracemalloc
+
+import pytest
+
+from trash_trouble import FPS, Game, ParticleList, greedy_policy, np
+
+BUDGET = 64  # bytes of live memory a frame may keep once play has warmed up
+WARMUP_FRAMES = FPS * 20
+MEASURED_FRAMES = FPS * 20
+
+ENGINES = ['list'] + (['numpy'] if np is not None else [])
+
+def steady_game(engine, seed=0):
+    """A swarm game at fixed quality, played by greedy_policy until its pools are warm."""
+    random.seed(seed)  # Game seeds itself from the global generator
+    game = Game(swarm=100, quality=0)
+    game.game_state = "playing"
+    if engine == 'list':
+        game.particles = ParticleList(seed)
+    play(game, WARMUP_FRAMES)
+    return game
+
+def play(game, frames):
+    for _ in range(frames):
+        game.lives = 3  # never game over
+        game.tick(greedy_policy(game))
+        game.draw_frame()
+
+def pools(game):
+    pools = {'trash': game.trash_pool, 'power_ups': game.powerup_pool}
+    if isinstance(game.particles, ParticleList):
+        pools['particles'] = game.particles.pool
+    return pools
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_steady_play_keeps_no_memory(engine):
+    game = steady_game(engine)
+    created = {name: pool.created for name, pool in pools(game).items()}
+    tracemalloc.start(5)
+    try:
+        before = tracemalloc.take_snapshot()
+        start = tracemalloc.get_traced_memory()[0]
+        play(game, MEASURED_FRAMES)
+        bytes_per_frame = (tracemalloc.get_traced_memory()[0] - start) / MEASURED_FRAMES
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    
+    growth = [str(stat) for stat in after.compare_to(before, 'lineno')[:5] if stat.size_diff > 0]
+    assert bytes_per_frame <= BUDGET, "\n".join(growth)
+    new = {name: pool.created - created[name] for name, pool in pools(game).items()}
+    assert new['trash'] == 0
+    # Power-ups spawn every ten seconds, so their pool fills slowly, but never past the cap
+    assert game.powerup_pool.created <= game.max_power_ups
+    # The particle pool may still top up for the odd larger burst
+    assert new.get('particles', 0) <= 16
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from trash_trouble import (ACTION_LEFT, ACTION_NONE, ACTION_RIGHT, BatchSimulation, Simulation,
+                           batch_state, check_batch_parity, greedy_policy, simulation_state)
+
+def chase_powerups(sim, rng):
+    """Stand under the first falling power-up, otherwise play greedily."""
+    if not sim.power_ups:
+        return greedy_policy(sim)
+    powerup = sim.power_ups[0]
+    center = sim.player.x + sim.player.width // 2
+    target = powerup.x + powerup.width // 2
+    if target < center - sim.player.speed:
+        return ACTION_LEFT
+    if target > center + sim.player.speed:
+        return ACTION_RIGHT
+    return ACTION_NONE
+
+def run_side_by_side(choose, games=32, ticks=4000, seed=0):
+    """Tick BatchSimulation and scalar Simulations together.
+
+    Returns the mismatches as (tick, seed, {key: (expected, actual)}) and
+    the set of rule paths the scalar games went through.
+    """
+    seeds = [seed + i for i in range(games)]
+    batch = BatchSimulation(seeds)
+    sims = [Simulation(s) for s in seeds]
+    rng = random.Random(seed)
+    mismatches = []
+    seen = set()
+    for tick in range(ticks):
+        actions = np.array([choose(sim, rng) for sim in sims], np.int64)
+        batch.tick(actions)
+        for i, sim in enumerate(sims):
+            if sim.game_state == "playing":
+                timer = sim.timer
+                sim.tick(int(actions[i]))
+                if sim.timer > timer:
+                    seen.add('extra_time')
+            if sim.combo_count >= 3:
+                seen.add('combo')
+            if sim.slow_time:
+                seen.add('slow_time')
+            if sim.score_multiplier == 2:
+                seen.add('double_points')
+            if sim.lives > 3:
+                seen.add('extra_life')
+            if sim.game_state != "playing":
+                seen.add('game_over')
+            expected = simulation_state(sim)
+            actual = batch_state(batch, i)
+            if actual != expected:
+                diff = {key: (expected[key], actual[key]) for key in expected if expected[key] != actual[key]}
+                mismatches.append((tick, seeds[i], diff))
+        if mismatches or all(sim.game_state != "playing" for sim in sims):
+            break
+    return mismatches, seen
+
+def test_greedy_play_matches():
+    mismatches, seen = run_side_by_side(lambda sim, rng: greedy_policy(sim))
+    assert mismatches == []
+    assert {'combo', 'extra_life'} <= seen
+
+def test_random_keys_match():
+    mismatches, seen = run_side_by_side(lambda sim, rng: rng.randrange(8), seed=100)
+    assert mismatches == []
+    assert 'game_over' in seen
+
+def test_powerup_effects_match():
+    mismatches, seen = run_side_by_side(chase_powerups, seed=200)
+    assert mismatches == []
+    assert {'slow_time', 'double_points', 'extra_time', 'combo'} <= seen
+
+def test_check_batch_parity_mixed_play():
+    assert check_batch_parity(games=16, ticks=2000) == []
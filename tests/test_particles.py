@@ -0,0 +1,42 @@
+import pytest
+
+from trash_trouble import ParticleSystem, np
+
+pytestmark = pytest.mark.skipif(np is None, reason="ParticleSystem needs NumPy")
+
+def colors(count, start=0):
+    return [(n % 256, n // 256, 7) for n in range(start, start + count)]
+
+def test_full_palette_keeps_live_particle_colours():
+    particles = ParticleSystem(capacity=512, seed=0)
+    for color in colors(256):
+        particles.emit(0, 0, color, 1)
+    particles.life[:particles.count] = 1
+    particles.life[:10] = 5  # the first ten colours stay alive
+    particles.update()
+    live = [particles.palette[i] for i in particles.color[:particles.count]]
+    
+    for color in colors(20, start=256):
+        particles.emit(0, 0, color, 1)
+    
+    assert len(particles.palette) == ParticleSystem.PALETTE_SIZE
+    assert [particles.palette[i] for i in particles.color[:10]] == live
+    assert [particles.palette[i] for i in particles.color[10:particles.count]] == colors(20, start=256)
+    assert all(particles.palette[i] == c for c, i in particles.palette_index.items())
+
+def test_palette_reuses_least_recently_used_colour():
+    particles = ParticleSystem(capacity=512, seed=0)
+    for color in colors(256):
+        particles.emit(0, 0, color, 1)
+    particles.emit(0, 0, colors(1)[0], 1)  # colour 0 becomes the most recently used
+    particles.count = 0
+    
+    assert particles.color_index((9, 9, 9)) == particles.palette.index((9, 9, 9)) == 1
+    assert particles.palette_index[colors(1)[0]] == 0
+
+def test_palette_full_of_live_colours_raises():
+    particles = ParticleSystem(capacity=512, seed=0)
+    for color in colors(256):
+        particles.emit(0, 0, color, 1)
+    with pytest.raises(RuntimeError):
+        particles.color_index((9, 9, 9))
@@ -3,17 +3,58 @@ import random
 import sys
 import os
 import math
-from tkinter import Tk, filedialog
+import io
+import hashlib
+import time
+import argparse
+import copy
+import struct
+import importlib
+import json
+import multiprocessing
+import queue
+import sqlite3
+import threading
+import subprocess
+import tempfile
+import gc
+import tracemalloc
+import weakref
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from functools import partial
+
+try:
+    import numpy as np
+except ImportError:  # the vectorised particle engine is optional
+    np = None
+try:
+    from PIL import Image
+except ImportError:  # without Pillow, large photos are decoded at full size by pygame
+    Image = None
+try:
+    import resource
+except ImportError:  # peak RSS is only reported where the platform provides it
+    resource = None
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+# Pygame subsystems are started on demand (see init_display), so importing this
+# module has no side effects and works without a display or audio device
 
 # Constants
 SCREEN_WIDTH = 900
 SCREEN_HEIGHT = 700
 FPS = 60
 
+# Fixed-timestep loop: the simulation always advances in 1/FPS ticks
+TICK_SECONDS = 1.0 / FPS
+MAX_CATCH_UP_STEPS = 5      # ticks simulated per frame before rendering is skipped
+MAX_SKIPPED_RENDERS = 5     # consecutive skipped renders before falling behind is accepted
+LATE_FRAME_SECONDS = 1.5 / FPS
+# Screens that only change on input; the loop sleeps in pygame.event.wait() there
+IDLE_STATES = ("enter_name", "menu", "game_over")
+IDLE_POLL_MS = 500          # longest idle wait, so the leaderboard shows up once loaded
+LOADING_FRAME_MS = 300      # step of the "Loading..." animation
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -32,6 +73,8 @@ LIGHT_BLUE = (173, 216, 230)
 SILVER = (192, 192, 192)
 CREAM = (245, 245, 220)
 
+SKY_BLUE = (135, 206, 235)
+
 # Player settings
 PLAYER_WIDTH = 60
 PLAYER_HEIGHT = 80
@@ -46,9 +89,282 @@ TRASH_SPEED = 2.5
 BIN_WIDTH = 100
 BIN_HEIGHT = 80
 
+# Default entity caps
+MAX_TRASH = 4
+MAX_POWER_UPS = 1
+
+# Entity caps above which collisions go through a spatial hash
+BROADPHASE_MIN_ENTITIES = 16
+
+TRASH_NAMES = ["Plastic", "Paper", "Organic", "Metal", "Glass"]
+
+# Input actions for one simulation tick (bit flags)
+ACTION_NONE = 0
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_DROP = 4
+
+# Timed effects, in ticks
+SLOW_TIME_TICKS = 300
+DOUBLE_POINTS_TICKS = 300
+COMBO_TICKS = 180
+GLOW_TICKS = 30
+
+# Timers due on the same tick fire in this order, so spawns see effects that just ended
+PRIORITY_EFFECT = 0
+PRIORITY_SPAWN_TRASH = 1
+PRIORITY_SPAWN_POWERUP = 2
+
+# Text rendering cache
+class TextCache:
+    """Shared font registry plus an LRU cache of rendered text surfaces, per render scale."""
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(None, size)
+            self.fonts[size] = font
+        return font
+    
+    def render(self, text, size, color, scale=1):
+        key = (text, size, color, scale)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.font(size if scale == 1 else max(1, round(size * scale))).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+    
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+def init_display():
+    """Start the pygame subsystems the windowed game uses.
+
+    The game has no sound, so the mixer is never started.
+    """
+    pygame.display.init()
+    pygame.font.init()
+
+# Display scaling
+class Canvas:
+    """A surface drawn on in logical coordinates at a render scale.
+
+    The surface is `scale` times the logical size; positions, rects and radii
+    are scaled on the way in. Blitted surfaces must already be at the canvas
+    scale: the sprite atlas, text cache and particle sprites keep a copy per
+    scale, and scaled() resizes anything else once. Scales are whole
+    percentages, so logical coordinates map to pixels exactly. At scale 1 the
+    drawing methods are the surface's own and pygame.draw's.
+    """
+    def __init__(self, surface, scale=1, size=None):
+        self.surface = surface
+        self.percent = round(scale * 100)
+        self.scale = self.percent / 100
+        width, height = surface.get_size()
+        self.size = size or (width * 100 // self.percent, height * 100 // self.percent)
+        # Logical pixels a shape can land off its scaled rect, as positions,
+        # radii and scroll offsets are rounded separately
+        self.slack = 0 if self.percent == 100 else math.ceil(2 / self.scale)
+        self.scaled_surfaces = weakref.WeakKeyDictionary()
+        if self.percent == 100:
+            # Native resolution: these shadow the scaling methods below
+            self.blit = surface.blit
+            self.blits = surface.blits
+            self.fill = surface.fill
+            self.rect = partial(pygame.draw.rect, surface)
+            self.circle = partial(pygame.draw.circle, surface)
+    
+    @classmethod
+    def blank(cls, size, scale=1, flags=0):
+        """A new canvas for size logical pixels, e.g. to bake a sprite on."""
+        percent = round(scale * 100)
+        width, height = size
+        return cls(pygame.Surface((-(-width * percent // 100), -(-height * percent // 100)), flags), scale, size)
+    
+    def get_size(self):
+        return self.size
+    
+    def get_rect(self):
+        return pygame.Rect((0, 0), self.size)
+    
+    def px(self, value):
+        """A logical coordinate in canvas pixels."""
+        return int(value * self.percent // 100)
+    
+    def length(self, value):
+        """A logical radius or line width in canvas pixels; never rounded away to 0."""
+        return max(1, round(value * self.scale)) if value else 0
+    
+    def pixel_rect(self, rect):
+        """The canvas pixels covering a logical rect, rounded outwards."""
+        x, y, width, height = rect
+        left, top = self.px(x), self.px(y)
+        return pygame.Rect(left, top, int(-(-(x + width) * self.percent // 100)) - left,
+                           int(-(-(y + height) * self.percent // 100)) - top)
+    
+    def blit(self, source, dest, area=None, special_flags=0):
+        if area is not None:
+            area = self.pixel_rect(area)
+        return self.surface.blit(source, (self.px(dest[0]), self.px(dest[1])), area, special_flags)
+    
+    def blits(self, blit_sequence, doreturn=True):
+        px = self.px
+        return self.surface.blits([(source, (px(x), px(y))) for source, (x, y) in blit_sequence], doreturn)
+    
+    def fill(self, color, rect=None):
+        return self.surface.fill(color, None if rect is None else self.pixel_rect(rect))
+    
+    def rect(self, color, rect, width=0, border_radius=0):
+        x, y, w, h = rect
+        left, top = self.px(x), self.px(y)
+        shape = pygame.Rect(left, top, self.px(x + w) - left, self.px(y + h) - top)
+        return pygame.draw.rect(self.surface, color, shape, self.length(width), border_radius=self.length(border_radius))
+    
+    def circle(self, color, center, radius, width=0):
+        center = (self.px(center[0]), self.px(center[1]))
+        return pygame.draw.circle(self.surface, color, center, self.length(radius), self.length(width))
+    
+    def text(self, text, size, color, **anchor):
+        """Blit cached text placed by Rect anchors, e.g. midtop=(x, y); returns its logical rect."""
+        surface = text_cache.render(text, size, color, self.scale)
+        if self.percent == 100:
+            rect = surface.get_rect(**anchor)
+            self.surface.blit(surface, rect)
+            return rect
+        width, height = surface.get_size()
+        rect = pygame.Rect(0, 0, round(width / self.scale), round(height / self.scale))
+        for name, value in anchor.items():
+            setattr(rect, name, value)
+        self.blit(surface, rect)
+        return rect
+    
+    def scaled(self, surface):
+        """A surface made at logical size, such as a face image, resized once to the canvas scale."""
+        if self.percent == 100:
+            return surface
+        scaled = self.scaled_surfaces.get(surface)
+        if scaled is None:
+            width, height = surface.get_size()
+            size = (self.length(width), self.length(height))
+            # smoothscale needs 24 or 32 bits
+            source = surface if surface.get_bitsize() >= 24 else with_alpha(surface)
+            scaled = self.scaled_surfaces[surface] = pygame.transform.smoothscale(source, size)
+        return scaled
+
+class Presenter:
+    """Shows the game canvas on a display of any size.
+
+    The game draws in SCREEN_WIDTH x SCREEN_HEIGHT logical coordinates onto a
+    Canvas at render_scale, so a low-end device can draw a quarter of the
+    pixels at half scale. When the window is exactly the canvas size the
+    canvas is the display surface itself. Otherwise it is an offscreen
+    surface that present() scales into a letterboxed area of the display
+    with one call, writing into a cached subsurface so no frame-sized
+    surface is allocated per frame. Nearest-neighbour scaling is used unless
+    the frame is shrunk, where smoothscale keeps text legible (smooth
+    overrides this). At whole-number factors only the dirty rects are
+    scaled and updated, and full frames are doubled in stages.
+    """
+    def __init__(self, window_size=None, fullscreen=False, smooth=None, render_scale=1):
+        self.smooth = smooth
+        percent = round(render_scale * 100)
+        self.size = (SCREEN_WIDTH * percent // 100, SCREEN_HEIGHT * percent // 100)
+        window_size = tuple(window_size or (SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.direct = not fullscreen and window_size == self.size
+        if self.direct:
+            surface = pygame.display.set_mode(self.size)
+        else:
+            if fullscreen:
+                pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            else:
+                pygame.display.set_mode(window_size, pygame.RESIZABLE)
+            surface = pygame.Surface(self.size).convert()
+        self.canvas = Canvas(surface, render_scale, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.layout()
+    
+    def layout(self):
+        """Fit the canvas to the current display size; call again after a resize."""
+        self.display = pygame.display.get_surface()
+        if self.direct:
+            self.zoom = 1
+            self.area = self.display.get_rect()
+            return
+        width, height = self.display.get_size()
+        self.zoom = min(width / self.size[0], height / self.size[1])
+        self.area = pygame.Rect(0, 0, max(1, round(self.size[0] * self.zoom)),
+                                max(1, round(self.size[1] * self.zoom)))
+        self.area.center = (width // 2, height // 2)
+        self.target = self.display.subsurface(self.area)
+        self.whole = self.zoom == int(self.zoom)
+        smooth = self.zoom < 1 if self.smooth is None else self.smooth
+        self.scaler = pygame.transform.smoothscale if smooth else pygame.transform.scale
+        # Whole zooms of 4, 8, ... go through cached doubling stages, which pygame scales much faster
+        self.stages = []
+        if self.whole and not smooth:
+            k, size = int(self.zoom), self.size
+            while k > 2 and k % 2 == 0:
+                k //= 2
+                size = (size[0] * 2, size[1] * 2)
+                self.stages.append(pygame.Surface(size).convert())
+        # Letterbox bars
+        self.display.fill(BLACK)
+        pygame.display.flip()
+    
+    def to_logical(self, pos):
+        """Map a display position, e.g. a mouse click, to logical coordinates."""
+        scale = self.zoom * self.canvas.scale
+        return (int((pos[0] - self.area.x) / scale), int((pos[1] - self.area.y) / scale))
+    
+    def present(self, dirty=None):
+        """Show the canvas; dirty lists the logical rects that changed, or None for all of it."""
+        canvas = self.canvas
+        if dirty is not None and canvas.percent != 100:
+            dirty = [canvas.pixel_rect(rect) for rect in dirty]
+        if self.direct:
+            if dirty is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty)
+        elif dirty is not None and self.whole and self.scaler is pygame.transform.scale:
+            k = int(self.zoom)
+            updated = []
+            for rect in dirty:
+                area = pygame.Rect(self.area.x + rect.x * k, self.area.y + rect.y * k, rect.width * k, rect.height * k)
+                pygame.transform.scale(canvas.surface.subsurface(rect), area.size, self.display.subsurface(area))
+                updated.append(area)
+            pygame.display.update(updated)
+        else:
+            source = canvas.surface
+            for stage in self.stages:
+                source = pygame.transform.scale(source, stage.get_size(), stage)
+            self.scaler(source, self.area.size, self.target)
+            pygame.display.update(self.area)
+
+text_cache = TextCache()
+
 # Particle system
 class Particle:
+    __slots__ = ('x', 'y', 'color', 'velocity_x', 'velocity_y', 'life', 'max_life')
+    
     def __init__(self, x, y, color, velocity_x=0, velocity_y=0):
+        self.reset(x, y, color, velocity_x, velocity_y)
+    
+    def reset(self, x, y, color, velocity_x=0, velocity_y=0):
         self.x = x
         self.y = y
         self.color = color
@@ -67,7 +383,312 @@ class Particle:
         alpha = int(255 * (self.life / self.max_life))
         size = int(5 * (self.life / self.max_life))
         if size > 0:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), size)
+            screen.circle(self.color, (int(self.x), int(self.y)), size)
+
+particle_sprites = {}
+
+def particle_sprite(color, size, scale=1):
+    key = (color, size, scale)
+    sprite = particle_sprites.get(key)
+    if sprite is None:
+        radius = size if scale == 1 else max(1, round(size * scale))
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        particle_sprites[key] = sprite
+    return sprite
+
+class ParticleList:
+    """Particle objects in a plain list; used when NumPy is not installed.
+
+    Dead particles go back to a free list and are reset for the next burst.
+    """
+    def __init__(self, seed=None):
+        self.particles = []
+        self.pool = EntityPool(Particle)
+        self.rng = random.Random(seed)
+    
+    def __len__(self):
+        return len(self.particles)
+    
+    def emit(self, x, y, color, count):
+        for _ in range(count):
+            velocity_x = self.rng.uniform(-3, 3)
+            velocity_y = self.rng.uniform(-5, -1)
+            self.particles.append(self.pool.acquire(x, y, color, velocity_x, velocity_y))
+    
+    def update(self):
+        # Compact live particles in place, keeping their order
+        particles = self.particles
+        live = 0
+        for particle in particles:
+            particle.update()
+            if particle.life > 0:
+                particles[live] = particle
+                live += 1
+            else:
+                self.pool.release(particle)
+        del particles[live:]
+    
+    def draw(self, screen):
+        for particle in self.particles:
+            particle.draw(screen)
+    
+    def blit_list(self, scale=1):
+        """(sprite, position) pairs for the live particles, for a canvas at scale."""
+        blits = []
+        for particle in self.particles:
+            size = int(5 * (particle.life / particle.max_life))
+            if size > 0:
+                blits.append((particle_sprite(particle.color, size, scale), (int(particle.x) - size, int(particle.y) - size)))
+        return blits
+    
+    def bounds(self):
+        if not self.particles:
+            return None
+        xs = [particle.x for particle in self.particles]
+        ys = [particle.y for particle in self.particles]
+        left, top = int(min(xs)) - 5, int(min(ys)) - 5
+        return pygame.Rect(left, top, int(max(xs)) + 6 - left, int(max(ys)) + 6 - top)
+
+class ParticleSystem:
+    """Struct-of-arrays particles kept in preallocated NumPy arrays.
+
+    Particles are stored oldest first. When an emit would exceed capacity
+    the oldest particles are dropped to make room.
+    """
+    LIFE = 30
+    GRAVITY = 0.2
+    PALETTE_SIZE = 256  # colour indices fit in a uint8
+    
+    def __init__(self, capacity=4096, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.dropped = 0
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.velocity_x = np.zeros(capacity, np.float32)
+        self.velocity_y = np.zeros(capacity, np.float32)
+        self.life = np.zeros(capacity, np.int16)
+        self.color = np.zeros(capacity, np.uint8)  # index into self.palette
+        self.arrays = (self.x, self.y, self.velocity_x, self.velocity_y, self.life, self.color)
+        self.palette = []
+        self.palette_index = OrderedDict()  # colour -> index, least recently used first
+        self.rng = np.random.default_rng(seed)
+    
+    def __len__(self):
+        return self.count
+    
+    def color_index(self, color):
+        """Palette index for color; when the palette is full the least recently used free slot is reused."""
+        palette_index = self.palette_index
+        index = palette_index.get(color)
+        if index is not None:
+            palette_index.move_to_end(color)
+            return index
+        if len(self.palette) < self.PALETTE_SIZE:
+            index = len(self.palette)
+            self.palette.append(color)
+        else:
+            in_use = np.bincount(self.color[:self.count], minlength=self.PALETTE_SIZE)
+            for old_color, index in palette_index.items():
+                if not in_use[index]:
+                    break
+            else:
+                raise RuntimeError(f"all {self.PALETTE_SIZE} particle colours are held by live particles")
+            del palette_index[old_color]
+            self.palette[index] = color
+        palette_index[color] = index
+        return index
+    
+    def emit(self, x, y, color, count):
+        count = min(count, self.capacity)
+        if count <= 0:
+            return
+        overflow = self.count + count - self.capacity
+        if overflow > 0:
+            keep = self.count - overflow
+            for array in self.arrays:
+                array[:keep] = array[overflow:self.count]
+            self.count = keep
+            self.dropped += overflow
+        
+        new = slice(self.count, self.count + count)
+        self.x[new] = x
+        self.y[new] = y
+        self.velocity_x[new] = self.rng.uniform(-3, 3, count)
+        self.velocity_y[new] = self.rng.uniform(-5, -1, count)
+        self.life[new] = self.LIFE
+        self.color[new] = self.color_index(color)
+        self.count += count
+    
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        self.x[:n] += self.velocity_x[:n]
+        self.y[:n] += self.velocity_y[:n]
+        self.velocity_y[:n] += self.GRAVITY
+        self.life[:n] -= 1
+        
+        alive = self.life[:n] > 0
+        if not alive.all():
+            # Compact survivors to the front, keeping oldest-first order
+            alive_count = int(alive.sum())
+            for array in self.arrays:
+                array[:alive_count] = array[:n][alive]
+            self.count = alive_count
+    
+    def draw(self, screen):
+        if self.count:
+            screen.blits(self.blit_list(screen.scale), doreturn=False)
+    
+    def blit_list(self, scale=1):
+        """(sprite, position) pairs for the live particles, for a canvas at scale."""
+        n = self.count
+        if not n:
+            return []
+        sizes = (5 * self.life[:n].astype(np.int32)) // self.LIFE
+        visible = sizes > 0
+        sizes = sizes[visible]
+        xs = self.x[:n][visible].astype(np.int32) - sizes
+        ys = self.y[:n][visible].astype(np.int32) - sizes
+        keys = self.color[:n][visible].astype(np.int32) * 8 + sizes
+        palette = self.palette
+        sprites = {key: particle_sprite(palette[key >> 3], key & 7, scale) for key in np.unique(keys).tolist()}
+        return [(sprites[key], (x, y)) for key, x, y in zip(keys.tolist(), xs.tolist(), ys.tolist())]
+    
+    def bounds(self):
+        n = self.count
+        if not n:
+            return None
+        left, top = int(self.x[:n].min()) - 5, int(self.y[:n].min()) - 5
+        return pygame.Rect(left, top, int(self.x[:n].max()) + 6 - left, int(self.y[:n].max()) + 6 - top)
+
+def new_particle_system(seed=None):
+    if np is None:
+        return ParticleList(seed)
+    return ParticleSystem(seed=seed)
+
+def benchmark_particles(population=5000, frames=300, draw=True):
+    """Time update (and draw) per frame for the list and NumPy particle engines."""
+    screen = Canvas(pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)))
+    engines = [('list', ParticleList(0))]
+    if np is not None:
+        engines.append(('numpy', ParticleSystem(capacity=max(population, 1), seed=0)))
+    burst = max(1, population // ParticleSystem.LIFE)
+    results = {}
+    for name, particles in engines:
+        start = time.perf_counter()
+        for frame in range(frames):
+            particles.emit(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, GREEN if frame % 2 else RED, burst)
+            particles.update()
+            if draw:
+                particles.draw(screen)
+        results[name] = (time.perf_counter() - start) / frames * 1000
+    return results
+
+# Face images
+FACE_SIZE = 30  # fits inside the robot's head (radius 18) with a margin
+FACE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".trash_trouble", "faces")
+FACE_PRESCALE = FACE_SIZE * 8  # cheap first-pass size for large photos
+FACE_LOADED = pygame.event.custom_type()  # posted by the face loader thread
+FACE_DIALOG_SCRIPT = """
+from tkinter import Tk, filedialog
+root = Tk()
+root.withdraw()
+print(filedialog.askopenfilename(
+    title="Select a face image for your robot",
+    filetypes=[("Image Files", "*.png *.jpg *.jpeg *.bmp *.gif")]
+))
+root.destroy()
+"""
+
+def choose_face_file():
+    """Show the file dialog in a child process and return the chosen path, or None.
+
+    Tk wants to own the main thread of its process, so it gets a process of
+    its own rather than sharing one with SDL.
+    """
+    try:
+        result = subprocess.run([sys.executable, "-c", FACE_DIALOG_SCRIPT], capture_output=True, text=True)
+    except OSError as e:
+        print(f"File dialog unavailable: {e}")
+        return None
+    if result.returncode:
+        error = result.stderr.strip().splitlines()
+        print(f"File dialog unavailable: {error[-1] if error else result.returncode}")
+        return None
+    return result.stdout.strip() or None
+
+def with_alpha(surface):
+    """Copy a surface into a 32-bit surface with an alpha channel, without needing the display."""
+    copy = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+    copy.blit(surface, (0, 0))
+    return copy
+
+def mask_face_image(image):
+    """Scale an image to FACE_SIZE and cut it to a circle, ready to blit."""
+    if image.get_bitsize() < 24:
+        image = with_alpha(image)  # smoothscale needs 24 or 32 bits
+    # Scale the face image to fit the circle
+    face_surface = pygame.transform.smoothscale(image, (FACE_SIZE, FACE_SIZE))
+    if not face_surface.get_flags() & pygame.SRCALPHA:
+        face_surface = with_alpha(face_surface)
+    
+    # Create circular mask
+    mask = pygame.Surface((FACE_SIZE, FACE_SIZE), pygame.SRCALPHA)
+    pygame.draw.circle(mask, (255, 255, 255, 255), (FACE_SIZE//2, FACE_SIZE//2), FACE_SIZE//2)
+    
+    # Apply mask: keep pixels inside the circle, clear the corners
+    face_surface.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+    return face_surface
+
+def decode_face_image(data, name):
+    """Decode image bytes, shrinking large photos to about FACE_PRESCALE first."""
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(data)) as picture:
+                # JPEGs can be decoded at 1/2 to 1/8 scale directly
+                picture.draft('RGB', (FACE_PRESCALE, FACE_PRESCALE))
+                picture = picture.convert('RGBA')
+            picture.thumbnail((FACE_PRESCALE, FACE_PRESCALE))
+            return pygame.image.frombytes(picture.tobytes(), picture.size, 'RGBA')
+        except Exception as e:
+            print(f"Pillow could not decode {name}, trying pygame: {e}")
+    
+    image = pygame.image.load(io.BytesIO(data), name)
+    width, height = image.get_size()
+    if width > FACE_PRESCALE or height > FACE_PRESCALE:
+        # A nearest-neighbour pass is nearly free; smoothscale then averages what is left
+        image = pygame.transform.scale(image, (min(width, FACE_PRESCALE), min(height, FACE_PRESCALE)))
+    return image
+
+def prepare_face_image(file_path, cache_dir=FACE_CACHE_DIR):
+    """Decode, scale and mask a face image, reusing the result cached for identical files.
+
+    Safe to call off the main thread; the surface is not yet converted to
+    the display format.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    cached_path = os.path.join(cache_dir, f"{hashlib.sha1(data).hexdigest()}-{FACE_SIZE}.png")
+    if os.path.exists(cached_path):
+        try:
+            return pygame.image.load(cached_path)
+        except pygame.error as e:
+            print(f"Ignoring unreadable cached face: {e}")
+    
+    face = mask_face_image(decode_face_image(data, file_path))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        pygame.image.save(face, cached_path)
+    except (OSError, pygame.error) as e:
+        print(f"Could not cache face image: {e}")
+    return face
+
+def load_face_image(file_path, cache_dir=FACE_CACHE_DIR):
+    """Load a face image ready to blit."""
+    return prepare_face_image(file_path, cache_dir).convert_alpha()
 
 class Player:
     def __init__(self):
@@ -80,6 +701,8 @@ class Player:
         self.animation_frame = 0
         self.facing_right = True
         self.face_image = None
+        self.prev_x = self.x
+        self.prev_y = self.y
         
     def move_left(self):
         if self.x > 0:
@@ -93,7 +716,22 @@ class Player:
             self.facing_right = True
             self.animation_frame += 0.2
     
-    def draw(self, screen):
+    def draw(self, screen, bob=True):
+        bob_offset = int(math.sin(self.animation_frame) * 1) if bob else 0
+        sprite = sprite_atlas.get('robot_blank' if self.face_image else 'robot', screen.scale)
+        if sprite is None:
+            self.draw_shapes(screen)
+            return
+        screen.blit(sprite, (self.x - 2, self.y + bob_offset))
+        if self.face_image:
+            self.draw_face(screen, (self.x + self.width // 2, self.y + 20 + bob_offset))
+    
+    def draw_face(self, screen, center):
+        # face_image is already scaled and masked by mask_face_image()
+        face_rect = self.face_image.get_rect(center=center)
+        screen.blit(screen.scaled(self.face_image), face_rect)
+    
+    def draw_shapes(self, screen, face=True):
         # Clean robot design like the reference image
         body_color = WHITE
         outline_color = BLACK
@@ -107,53 +745,38 @@ class Player:
         head_radius = 18
         
         # Head
-        pygame.draw.circle(screen, body_color, (head_center_x, head_center_y), head_radius)
-        pygame.draw.circle(screen, outline_color, (head_center_x, head_center_y), head_radius, 2)
+        screen.circle(body_color, (head_center_x, head_center_y), head_radius)
+        screen.circle(outline_color, (head_center_x, head_center_y), head_radius, 2)
         
         # Custom face or default face
-        if self.face_image:
-            # Create a circular surface for the face
-            face_surface = pygame.Surface((head_radius * 2 - 6, head_radius * 2 - 6), pygame.SRCALPHA)
-            
-            # Scale the face image to fit the circle
-            face_size = head_radius * 2 - 6
-            scaled_face = pygame.transform.scale(self.face_image, (face_size, face_size))
-            
-            # Create circular mask
-            mask = pygame.Surface((face_size, face_size), pygame.SRCALPHA)
-            pygame.draw.circle(mask, (255, 255, 255, 255), (face_size//2, face_size//2), face_size//2)
-            
-            # Apply mask to the scaled face
-            face_surface.blit(scaled_face, (0, 0))
-            face_surface.blit(mask, (0, 0), special_flags=pygame.BLEND_ALPHA_SDL2)
-            
-            # Draw the masked face
-            face_rect = face_surface.get_rect(center=(head_center_x, head_center_y))
-            screen.blit(face_surface, face_rect)
+        if not face:
+            pass
+        elif self.face_image:
+            self.draw_face(screen, (head_center_x, head_center_y))
         else:
             # Default robot eyes (simple black dots)
             eye_y = head_center_y - 3
             left_eye_x = head_center_x - 6
             right_eye_x = head_center_x + 6
             
-            pygame.draw.circle(screen, BLACK, (left_eye_x, eye_y), 3)
-            pygame.draw.circle(screen, BLACK, (right_eye_x, eye_y), 3)
+            screen.circle(BLACK, (left_eye_x, eye_y), 3)
+            screen.circle(BLACK, (right_eye_x, eye_y), 3)
         
         # Body (rounded rectangle)
         body_rect = pygame.Rect(self.x + 8, self.y + 35 + bob_offset, self.width - 16, self.height - 45)
-        pygame.draw.rect(screen, LIGHT_BLUE, body_rect, border_radius=8)
-        pygame.draw.rect(screen, outline_color, body_rect, 2, border_radius=8)
+        screen.rect(LIGHT_BLUE, body_rect, border_radius=8)
+        screen.rect(outline_color, body_rect, 2, border_radius=8)
         
         # Chest panel
         chest_rect = pygame.Rect(self.x + 15, self.y + 42 + bob_offset, self.width - 30, 15)
-        pygame.draw.rect(screen, CREAM, chest_rect, border_radius=3)
-        pygame.draw.rect(screen, outline_color, chest_rect, 1, border_radius=3)
+        screen.rect(CREAM, chest_rect, border_radius=3)
+        screen.rect(outline_color, chest_rect, 1, border_radius=3)
         
         # Simple chest lights
         light_y = self.y + 49 + bob_offset
-        pygame.draw.circle(screen, GREEN, (self.x + 22, light_y), 2)
-        pygame.draw.circle(screen, RED, (self.x + 30, light_y), 2)
-        pygame.draw.circle(screen, YELLOW, (self.x + 38, light_y), 2)
+        screen.circle(GREEN, (self.x + 22, light_y), 2)
+        screen.circle(RED, (self.x + 30, light_y), 2)
+        screen.circle(YELLOW, (self.x + 38, light_y), 2)
         
         # Arms (simple rectangles)
         arm_y = self.y + 38 + bob_offset
@@ -162,13 +785,13 @@ class Player:
         
         # Left arm
         left_arm_rect = pygame.Rect(self.x - 2, arm_y, arm_width, arm_height)
-        pygame.draw.rect(screen, body_color, left_arm_rect, border_radius=4)
-        pygame.draw.rect(screen, outline_color, left_arm_rect, 2, border_radius=4)
+        screen.rect(body_color, left_arm_rect, border_radius=4)
+        screen.rect(outline_color, left_arm_rect, 2, border_radius=4)
         
         # Right arm
         right_arm_rect = pygame.Rect(self.x + self.width - 6, arm_y, arm_width, arm_height)
-        pygame.draw.rect(screen, body_color, right_arm_rect, border_radius=4)
-        pygame.draw.rect(screen, outline_color, right_arm_rect, 2, border_radius=4)
+        screen.rect(body_color, right_arm_rect, border_radius=4)
+        screen.rect(outline_color, right_arm_rect, 2, border_radius=4)
         
         # Legs (simple rectangles)
         leg_y = self.y + self.height - 20 + bob_offset
@@ -177,140 +800,427 @@ class Player:
         
         # Left leg
         left_leg_rect = pygame.Rect(self.x + 12, leg_y, leg_width, leg_height)
-        pygame.draw.rect(screen, SILVER, left_leg_rect, border_radius=3)
-        pygame.draw.rect(screen, outline_color, left_leg_rect, 2, border_radius=3)
+        screen.rect(SILVER, left_leg_rect, border_radius=3)
+        screen.rect(outline_color, left_leg_rect, 2, border_radius=3)
         
         # Right leg
         right_leg_rect = pygame.Rect(self.x + self.width - 24, leg_y, leg_width, leg_height)
-        pygame.draw.rect(screen, SILVER, right_leg_rect, border_radius=3)
-        pygame.draw.rect(screen, outline_color, right_leg_rect, 2, border_radius=3)
+        screen.rect(SILVER, right_leg_rect, border_radius=3)
+        screen.rect(outline_color, right_leg_rect, 2, border_radius=3)
 
 class TrashItem:
-    def __init__(self, trash_type=None):
-        self.x = random.randint(50, SCREEN_WIDTH - TRASH_WIDTH - 50)
+    # Extended trash types: 0=Plastic, 1=Paper, 2=Organic, 3=Metal, 4=Glass
+    COLORS = (BLUE, WHITE, BROWN, GRAY, LIGHT_GREEN)
+    NAMES = tuple(TRASH_NAMES)
+    
+    __slots__ = ('x', 'y', 'width', 'height', 'speed', 'prev_x', 'prev_y',
+                 'rotation', 'rotation_speed', 'trash_type')
+    
+    def __init__(self, trash_type=None, rng=random):
+        self.reset(trash_type, rng)
+    
+    def reset(self, trash_type=None, rng=random):
+        self.x = rng.randint(50, SCREEN_WIDTH - TRASH_WIDTH - 50)
         self.y = -TRASH_HEIGHT
         self.width = TRASH_WIDTH
         self.height = TRASH_HEIGHT
         self.speed = TRASH_SPEED
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.rotation = 0
-        self.rotation_speed = random.uniform(-2, 2)
+        self.rotation_speed = rng.uniform(-2, 2)
         
-        # Extended trash types: 0=Plastic, 1=Paper, 2=Organic, 3=Metal, 4=Glass
         if trash_type is None:
-            self.trash_type = random.randint(0, 4)
+            self.trash_type = rng.randint(0, 4)
         else:
             self.trash_type = trash_type
-            
-        self.colors = [BLUE, WHITE, BROWN, GRAY, LIGHT_GREEN]
-        self.names = ["Plastic", "Paper", "Organic", "Metal", "Glass"]
         
     def update(self):
+        self.prev_y = self.y
         self.y += self.speed
         self.rotation += self.rotation_speed
         
     def draw(self, screen):
-        # Simple geometric shapes for trash
-        center_x = self.x + self.width // 2
-        center_y = self.y + self.height // 2
-        
-        if self.trash_type == 0:  # Plastic - Blue square
-            pygame.draw.rect(screen, BLUE, (self.x, self.y, self.width, self.height))
-            pygame.draw.rect(screen, BLACK, (self.x, self.y, self.width, self.height), 2)
-        elif self.trash_type == 1:  # Paper - White square
-            pygame.draw.rect(screen, WHITE, (self.x, self.y, self.width, self.height))
-            pygame.draw.rect(screen, BLACK, (self.x, self.y, self.width, self.height), 2)
-        elif self.trash_type == 2:  # Organic - Brown square
-            pygame.draw.rect(screen, BROWN, (self.x, self.y, self.width, self.height))
-            pygame.draw.rect(screen, BLACK, (self.x, self.y, self.width, self.height), 2)
-        elif self.trash_type == 3:  # Metal - Gray square
-            pygame.draw.rect(screen, GRAY, (self.x, self.y, self.width, self.height))
-            pygame.draw.rect(screen, BLACK, (self.x, self.y, self.width, self.height), 2)
-        elif self.trash_type == 4:  # Glass - Light green square
-            pygame.draw.rect(screen, LIGHT_GREEN, (self.x, self.y, self.width, self.height))
-            pygame.draw.rect(screen, BLACK, (self.x, self.y, self.width, self.height), 2)
+        sprite = sprite_atlas.get(('trash', self.trash_type), screen.scale)
+        if sprite is None:
+            self.draw_shapes(screen)
+        else:
+            screen.blit(sprite, (self.x, self.y))
+    
+    def draw_shapes(self, screen):
+        # Simple geometric shapes for trash: a square in the type's colour
+        screen.rect(self.COLORS[self.trash_type], (self.x, self.y, self.width, self.height))
+        screen.rect(BLACK, (self.x, self.y, self.width, self.height), 2)
 
 class Bin:
+    COLORS = TrashItem.COLORS
+    NAMES = tuple(name.upper() for name in TRASH_NAMES)
+    
+    __slots__ = ('x', 'y', 'width', 'height', 'bin_type', 'glow')
+    
     def __init__(self, x, bin_type):
         self.x = x
         self.y = SCREEN_HEIGHT - BIN_HEIGHT - 30
         self.width = BIN_WIDTH
         self.height = BIN_HEIGHT
         self.bin_type = bin_type
-        self.colors = [BLUE, WHITE, BROWN, GRAY, LIGHT_GREEN]
-        self.names = ["PLASTIC", "PAPER", "ORGANIC", "METAL", "GLASS"]
-        self.glow = 0
+        self.glow = False  # switched off by a timer in Simulation
         
     def draw(self, screen):
+        sprite = sprite_atlas.get(('bin', self.bin_type, self.glow), screen.scale)
+        if sprite is None:
+            self.draw_shapes(screen)
+            return
+        screen.blit(sprite, (self.x - 5, self.y - 5))
+    
+    def draw_shapes(self, screen):
         # Glow effect
-        if self.glow > 0:
-            pygame.draw.rect(screen, GREEN, 
-                           (self.x - 5, self.y - 5, self.width + 10, self.height + 10), border_radius=5)
-            self.glow -= 1
+        if self.glow:
+            screen.rect(GREEN, 
+                      (self.x - 5, self.y - 5, self.width + 10, self.height + 10), border_radius=5)
         
         # Main bin (rounded rectangle like reference image)
-        pygame.draw.rect(screen, self.colors[self.bin_type], 
-                        (self.x, self.y, self.width, self.height), border_radius=8)
-        pygame.draw.rect(screen, BLACK, 
-                        (self.x, self.y, self.width, self.height), 3, border_radius=8)
+        screen.rect(self.COLORS[self.bin_type], 
+                   (self.x, self.y, self.width, self.height), border_radius=8)
+        screen.rect(BLACK, 
+                   (self.x, self.y, self.width, self.height), 3, border_radius=8)
         
         # Label
-        font = pygame.font.Font(None, 18)
-        text = font.render(self.names[self.bin_type], True, BLACK)
-        text_rect = text.get_rect(center=(self.x + self.width//2, self.y + self.height//2))
-        screen.blit(text, text_rect)
+        screen.text(self.NAMES[self.bin_type], 18, BLACK, center=(self.x + self.width//2, self.y + self.height//2))
 
 class PowerUp:
-    def __init__(self):
-        self.x = random.randint(50, SCREEN_WIDTH - 50)
+    TYPES = ('slow_time', 'extra_time', 'double_points', 'extra_life')
+    COLORS = {
+        'slow_time': PURPLE,
+        'extra_time': YELLOW,
+        'double_points': ORANGE,
+        'extra_life': PINK
+    }
+    SYMBOLS = {
+        'slow_time': '⏰',
+        'extra_time': '⏲️',
+        'double_points': '×2',
+        'extra_life': '♥'
+    }
+    
+    __slots__ = ('x', 'y', 'prev_x', 'prev_y', 'width', 'height', 'speed', 'type', 'bounce')
+    
+    def __init__(self, rng=random):
+        self.reset(rng)
+    
+    def reset(self, rng=random):
+        self.x = rng.randint(50, SCREEN_WIDTH - 50)
         self.y = -30
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.width = 30
         self.height = 30
         self.speed = 3
-        self.type = random.choice(['slow_time', 'extra_time', 'double_points', 'extra_life'])
-        self.colors = {
-            'slow_time': PURPLE,
-            'extra_time': YELLOW,
-            'double_points': ORANGE,
-            'extra_life': PINK
-        }
-        self.symbols = {
-            'slow_time': '⏰',
-            'extra_time': '⏲️',
-            'double_points': '×2',
-            'extra_life': '♥'
-        }
+        self.type = rng.choice(self.TYPES)
         self.bounce = 0
         
     def update(self):
+        self.prev_y = self.y
         self.y += self.speed
         self.bounce += 0.2
         
-    def draw(self, screen):
+    def draw(self, screen, bounce=True):
+        bounce_offset = int(math.sin(self.bounce) * 2) if bounce else 0
+        sprite = sprite_atlas.get(('powerup', self.type), screen.scale)
+        if sprite is None:
+            self.draw_shapes(screen)
+        else:
+            screen.blit(sprite, (self.x, self.y + bounce_offset))
+    
+    def draw_shapes(self, screen):
         bounce_offset = int(math.sin(self.bounce) * 2)
         y_pos = self.y + bounce_offset
         
         # Simple circle power-up
-        pygame.draw.circle(screen, self.colors[self.type], 
-                         (self.x + self.width//2, y_pos + self.height//2), 15)
-        pygame.draw.circle(screen, BLACK, 
-                         (self.x + self.width//2, y_pos + self.height//2), 15, 2)
+        screen.circle(self.COLORS[self.type], 
+                    (self.x + self.width//2, y_pos + self.height//2), 15)
+        screen.circle(BLACK, 
+                    (self.x + self.width//2, y_pos + self.height//2), 15, 2)
         
         # Symbol
-        font = pygame.font.Font(None, 20)
-        text = font.render(self.symbols[self.type], True, BLACK)
-        text_rect = text.get_rect(center=(self.x + self.width//2, y_pos + self.height//2))
-        screen.blit(text, text_rect)
+        screen.text(self.SYMBOLS[self.type], 20, BLACK, center=(self.x + self.width//2, y_pos + self.height//2))
 
-class Game:
+# Sprite atlas
+class SpriteAtlas:
+    """Entity sprites baked once per render scale from the immediate-mode draw code.
+
+    Each entity's draw() blits its sprite when the atlas is enabled and falls
+    back to draw_shapes() otherwise. Animation offsets (robot bobbing,
+    power-up bounce) are pure translations and are applied at blit time.
+    Sprites are baked by drawing the shapes on a Canvas at the target scale,
+    so half-scale sprites stay crisp rather than being shrunk copies.
+    """
     def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Trash Trouble - Clean Interface")
-        self.clock = pygame.time.Clock()
+        self.scales = {}  # render scale -> {key: sprite}
+        self.enabled = True
+    
+    def get(self, key, scale=1):
+        if not self.enabled:
+            return None
+        sprites = self.scales.get(scale)
+        if sprites is None:
+            sprites = self.build(scale)
+        return sprites.get(key)
+    
+    def bake(self, sprites, key, size, scale, entity, *args):
+        canvas = Canvas.blank(size, scale, pygame.SRCALPHA)
+        entity.draw_shapes(canvas, *args)
+        sprites[key] = canvas.surface
+    
+    def build(self, scale=1):
+        sprites = self.scales[scale] = {}
+        robot = Player()
+        robot.x, robot.y = 2, 0
+        self.bake(sprites, 'robot', (PLAYER_WIDTH + 4, PLAYER_HEIGHT), scale, robot)
+        self.bake(sprites, 'robot_blank', (PLAYER_WIDTH + 4, PLAYER_HEIGHT), scale, robot, False)
+        
+        for trash_type in range(5):
+            trash = TrashItem(trash_type)
+            trash.x, trash.y = 0, 0
+            self.bake(sprites, ('trash', trash_type), (TRASH_WIDTH, TRASH_HEIGHT), scale, trash)
+        
+        for bin_type in range(5):
+            for glow in (False, True):
+                bin = Bin(5, bin_type)
+                bin.y = 5
+                bin.glow = glow
+                self.bake(sprites, ('bin', bin_type, glow), (BIN_WIDTH + 10, BIN_HEIGHT + 10), scale, bin)
+        
+        for powerup_type in PowerUp.TYPES:
+            powerup = PowerUp()
+            powerup.x, powerup.y = 0, 0
+            powerup.type = powerup_type
+            self.bake(sprites, ('powerup', powerup_type), (powerup.width, powerup.height), scale, powerup)
+        return sprites
+
+sprite_atlas = SpriteAtlas()
+
+# Scheduling
+class Timer:
+    def __init__(self, due, priority, order, callback, args):
+        self.due = due
+        self.priority = priority
+        self.order = order
+        self.callback = callback
+        self.args = args
+        self.active = True
+    
+    def cancel(self):
+        self.active = False
+
+class TimerWheel:
+    """Hashed timer wheel that fires callbacks on the tick they are due.
+
+    A timer is filed in slot due % SIZE, so advancing a tick only looks at
+    one slot no matter how many timers are pending. Cancelling just flags
+    the timer; it is dropped when its slot comes round. Timers due on the
+    same tick fire by priority, then in the order they were set.
+    """
+    SIZE = 1024
+    
+    def __init__(self):
+        self.slots = [[] for _ in range(self.SIZE)]
+        self.scheduled = {}  # timers still in a slot, in the order they were set
+        self.now = -1
+        self.order = 0
+    
+    def schedule_at(self, due, callback, *args, priority=0):
+        if due <= self.now:
+            raise ValueError(f"timer due at tick {due} is not after tick {self.now}")
+        timer = Timer(due, priority, self.order, callback, args)
+        self.order += 1
+        self.slots[due % self.SIZE].append(timer)
+        self.scheduled[timer] = None
+        return timer
+    
+    def advance(self, tick):
+        """Fire the timers due on tick. Ticks must be advanced one at a time."""
+        self.now = tick
+        slot = self.slots[tick % self.SIZE]
+        if not slot:
+            return
+        due = []
+        pending = []
+        for timer in slot:
+            if not timer.active:
+                del self.scheduled[timer]
+            elif timer.due == tick:
+                due.append(timer)
+                del self.scheduled[timer]
+            else:
+                pending.append(timer)
+        # Timers set by the callbacks below land in the fresh list
+        self.slots[tick % self.SIZE] = pending
+        if len(due) > 1:
+            due.sort(key=lambda timer: (timer.priority, timer.order))
+        for timer in due:
+            timer.active = False
+            timer.callback(*timer.args)
+    
+    def active(self):
+        """Pending timers that have not been cancelled, in the order they were set."""
+        return [timer for timer in self.scheduled if timer.active]
+    
+    def restore(self, now, order, timers):
+        """Replace every pending timer with the given ones, e.g. from a saved state."""
+        for timer in self.scheduled:
+            timer.active = False
+            self.slots[timer.due % self.SIZE].clear()
+        self.scheduled = dict.fromkeys(timers)
+        for timer in timers:
+            self.slots[timer.due % self.SIZE].append(timer)
+        self.now = now
+        self.order = order
+
+# Entity storage and broadphase
+class EntityStore:
+    """Unordered entity list with O(1) append and swap-remove.
+
+    Removing moves the last entity into the freed slot, so iterate by index
+    from the end when removing during a pass.
+    """
+    def __init__(self):
+        self.items = []
+        self.index = {}
+    
+    def __len__(self):
+        return len(self.items)
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def __getitem__(self, i):
+        return self.items[i]
+    
+    def append(self, entity):
+        self.index[entity] = len(self.items)
+        self.items.append(entity)
+    
+    def clear(self):
+        self.items.clear()
+        self.index.clear()
+    
+    def remove(self, entity):
+        i = self.index.pop(entity)
+        last = self.items.pop()
+        if last is not entity:
+            self.items[i] = last
+            self.index[last] = i
+
+class EntityPool:
+    """Free list of released entities, reset and handed out again by acquire().
+
+    The entity class needs a reset() taking the same arguments as __init__,
+    so spawning in the frame loop reuses objects instead of allocating.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+        self.created = 0
+    
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            entity = self.free.pop()
+            entity.reset(*args, **kwargs)
+            return entity
+        self.created += 1
+        return self.factory(*args, **kwargs)
+    
+    def blank(self):
+        """An entity for the caller to fill in field by field, e.g. when restoring state."""
+        if self.free:
+            return self.free.pop()
+        self.created += 1
+        return self.factory.__new__(self.factory)
+    
+    def release(self, entity):
+        self.free.append(entity)
+
+class SpatialHash:
+    """Uniform grid of vertical columns over the play field.
+
+    Trash and power-ups only ever fall straight down, so the columns an
+    entity overlaps are fixed when it spawns. Insert and remove are O(1) and
+    the grid needs no per-tick maintenance; query() only tests entities in
+    the columns the rect spans. Columns are insertion-ordered dicts so query
+    order is deterministic.
+    """
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self.cells = {}
+    
+    def columns(self, x, width):
+        return range(int(x) // self.cell_size, int(x + width - 1) // self.cell_size + 1)
+    
+    def insert(self, entity):
+        for column in self.columns(entity.x, entity.width):
+            self.cells.setdefault(column, {})[entity] = None
+    
+    def remove(self, entity):
+        for column in self.columns(entity.x, entity.width):
+            del self.cells[column][entity]
+    
+    def clear(self):
+        self.cells.clear()
+    
+    def query(self, x, y, width, height):
+        """Entities whose rects overlap the given rect."""
+        cells = self.cells
+        found = {}
+        for column in self.columns(x, width):
+            cell = cells.get(column)
+            if cell:
+                found.update(cell)
+        return [entity for entity in found
+                if (x < entity.x + entity.width and x + width > entity.x and
+                    y < entity.y + entity.height and y + height > entity.y)]
+
+class LinearScan:
+    """Broadphase stand-in for small entity caps: query tests every entity."""
+    def __init__(self, entities):
+        self.entities = entities
+    
+    def insert(self, entity):
+        pass
+    
+    def remove(self, entity):
+        pass
+    
+    def clear(self):
+        pass
+    
+    def query(self, x, y, width, height):
+        return [entity for entity in self.entities
+                if (x < entity.x + entity.width and x + width > entity.x and
+                    y < entity.y + entity.height and y + height > entity.y)]
+
+def new_broadphase(entities, capacity):
+    if capacity > BROADPHASE_MIN_ENTITIES:
+        return SpatialHash()
+    return LinearScan(entities)
+
+class Simulation:
+    """Display-free game rules, advanced one fixed tick at a time."""
+    def __init__(self, seed=None, swarm=0):
+        self.seed = seed
+        self.recorder = None
+        self.profiler = None
+        self.rng = random.Random(seed)
+        # Cosmetic randomness (particles, background) has its own stream so
+        # effects never shift the gameplay sequence
+        self.effects_rng = random.Random(self.rng.getrandbits(64))
         
         self.player = Player()
-        self.trash_items = []
-        self.power_ups = []
-        self.particles = []
+        self.trash_items = EntityStore()
+        self.power_ups = EntityStore()
+        self.trash_pool = EntityPool(TrashItem)
+        self.powerup_pool = EntityPool(PowerUp)
+        self.particles = new_particle_system(self.effects_rng.getrandbits(32))
         
         # 5 bins evenly spaced
         bin_spacing = SCREEN_WIDTH // 6
@@ -326,106 +1236,271 @@ class Game:
         self.lives = 3
         self.level = 1
         self.timer = 180
+        self.ticks = 0
+        self.game_state = "playing"
         
-        # Game state
-        self.game_state = "enter_name"
-        self.player_name = ""
-        self.input_active = True
-        
-        # UI elements
-        self.input_box_rect = pygame.Rect(SCREEN_WIDTH//2 - 150, 200, 300, 50)
-        self.upload_button_rect = pygame.Rect(SCREEN_WIDTH//2 - 100, 280, 200, 40)
-        self.reset_face_button_rect = pygame.Rect(SCREEN_WIDTH//2 - 100, 330, 200, 40)
-        
-        self.player_face_image = self.load_player_face()
-        if self.player_face_image:
-            self.player.face_image = self.player_face_image
-            
-        self.high_score = 0
+        # Timed effects and spawns fire from the timer wheel
+        self.timers = TimerWheel()
+        self.effects = {}  # effect name -> the timer that ends it
         
         # Power-up effects
-        self.slow_time_timer = 0
-        self.double_points_timer = 0
+        self.slow_time = False
         self.score_multiplier = 1
         
-        # Spawn timers
-        self.spawn_timer = 0
+        # Spawn timers, first due as if counting from tick -1
         self.spawn_delay = 90
-        self.powerup_spawn_timer = 0
+        self.last_spawn_tick = -1
+        self.spawn_event = self.timers.schedule_at(self.spawn_delay - 1, self.spawn_due,
+                                                   priority=PRIORITY_SPAWN_TRASH)
         self.powerup_spawn_delay = 600
+        self.timers.schedule_at(self.powerup_spawn_delay - 1, self.powerup_spawn_due,
+                                priority=PRIORITY_SPAWN_POWERUP)
+        
+        # Entity caps; swarm mode fills the play field with falling objects
+        self.max_trash = MAX_TRASH
+        self.trash_per_spawn = 1
+        self.max_power_ups = MAX_POWER_UPS
+        if swarm:
+            self.max_trash = swarm
+            self.trash_per_spawn = max(1, swarm // 10)
+            self.max_power_ups = max(1, swarm // 50)
+        self.trash_grid = new_broadphase(self.trash_items, self.max_trash)
+        self.powerup_grid = new_broadphase(self.power_ups, self.max_power_ups)
         
         # Combo system
         self.combo_count = 0
-        self.combo_timer = 0
-        
-        # Background elements
-        self.background_elements = []
-        for i in range(15):
-            self.background_elements.append({
-                'x': random.randint(0, SCREEN_WIDTH),
-                'y': random.randint(0, SCREEN_HEIGHT),
-                'size': random.randint(2, 5),
-                'color': (255, 255, 255, 50),
-                'speed': random.uniform(0.5, 1.5)
-            })
-    
-    def open_file_dialog_and_load_face(self):
-        root = Tk()
-        root.withdraw()
-        file_path = filedialog.askopenfilename(
-            title="Select a face image for your robot",
-            filetypes=[("Image Files", "*.png *.jpg *.jpeg *.bmp *.gif")]
-        )
-        root.destroy()
         
-        if file_path:
-            try:
-                # Load and process the image
-                image = pygame.image.load(file_path).convert_alpha()
-                
-                # Scale to appropriate size
-                target_size = 32
-                image = pygame.transform.scale(image, (target_size, target_size))
-                
-                self.player_face_image = image
-                self.player.face_image = image
-                print(f"Face image loaded successfully: {file_path}")
-            except Exception as e:
-                print(f"Error loading face image: {e}")
-
-    def load_player_face(self, file_path=None):
-        try:
-            if file_path and os.path.exists(file_path):
-                image = pygame.image.load(file_path).convert_alpha()
-                image = pygame.transform.scale(image, (32, 32))
-                return image
-        except Exception as e:
-            print(f"Could not load face image: {e}")
-        return None
-    
-    def reset_face(self):
-        self.player.face_image = None
-        self.player_face_image = None
-        print("Robot face reset to default")
+        # Per-game statistics, indexed by trash type where relevant
+        self.lives_lost = 0
+        self.correct_drops = [0] * 5
+        self.wrong_drops = [0] * 5
+        self.missed_trash = [0] * 5
     
     def create_particles(self, x, y, color, count=5):
-        for _ in range(count):
-            velocity_x = random.uniform(-3, 3)
-            velocity_y = random.uniform(-5, -1)
-            self.particles.append(Particle(x, y, color, velocity_x, velocity_y))
+        self.particles.emit(x, y, color, count)
     
     def spawn_trash(self):
-        if len(self.trash_items) < 4:
-            new_trash = TrashItem()
+        for _ in range(self.trash_per_spawn):
+            if len(self.trash_items) >= self.max_trash:
+                break
+            new_trash = self.trash_pool.acquire(rng=self.rng)
             speed_multiplier = 1.0
-            if self.slow_time_timer > 0:
+            if self.slow_time:
                 speed_multiplier = 0.5
             new_trash.speed = (TRASH_SPEED + (self.level - 1) * 0.2) * speed_multiplier
             self.trash_items.append(new_trash)
+            self.trash_grid.insert(new_trash)
     
     def spawn_powerup(self):
-        if len(self.power_ups) < 1 and random.random() < 0.2:
-            self.power_ups.append(PowerUp())
+        if len(self.power_ups) < self.max_power_ups and self.rng.random() < 0.2:
+            powerup = self.powerup_pool.acquire(rng=self.rng)
+            self.power_ups.append(powerup)
+            self.powerup_grid.insert(powerup)
+    
+    def spawn_due(self):
+        self.spawn_trash()
+        self.last_spawn_tick = self.ticks
+        self.spawn_event = self.timers.schedule_at(self.ticks + self.spawn_delay, self.spawn_due,
+                                                   priority=PRIORITY_SPAWN_TRASH)
+    
+    def set_spawn_delay(self, delay):
+        """Change the trash spawn interval, moving the pending spawn to match."""
+        if delay == self.spawn_delay:
+            return
+        self.spawn_delay = delay
+        self.spawn_event.cancel()
+        due = max(self.last_spawn_tick + delay, self.timers.now + 1)
+        self.spawn_event = self.timers.schedule_at(due, self.spawn_due, priority=PRIORITY_SPAWN_TRASH)
+    
+    def powerup_spawn_due(self):
+        self.spawn_powerup()
+        self.timers.schedule_at(self.ticks + self.powerup_spawn_delay, self.powerup_spawn_due,
+                                priority=PRIORITY_SPAWN_POWERUP)
+    
+    def start_effect(self, name, ticks, on_end, *args, extend=False):
+        """Run a timed effect that calls on_end(*args) after the given ticks.
+
+        Triggering an effect that is still running restarts its duration, or
+        adds to what is left with extend=True.
+        """
+        timer = self.effects.get(name)
+        due = self.ticks + ticks
+        if timer:
+            timer.cancel()
+            if extend:
+                due = timer.due + ticks
+        self.effects[name] = self.timers.schedule_at(due, self.end_effect, name, on_end, args,
+                                                     priority=PRIORITY_EFFECT)
+    
+    def end_effect(self, name, on_end, args):
+        del self.effects[name]
+        on_end(*args)
+    
+    def effect_ticks(self, name):
+        """Ticks until the named effect ends, or 0 if it is not running."""
+        timer = self.effects.get(name)
+        return timer.due - self.ticks if timer else 0
+    
+    def end_slow_time(self):
+        self.slow_time = False
+    
+    def set_score_multiplier(self, multiplier):
+        self.score_multiplier = multiplier
+    
+    def end_combo(self):
+        self.combo_count = 0
+    
+    def end_glow(self, bin):
+        bin.glow = False
+    
+    def remove_trash(self, trash):
+        self.trash_items.remove(trash)
+        self.trash_grid.remove(trash)
+    
+    def remove_powerup(self, powerup):
+        self.power_ups.remove(powerup)
+        self.powerup_grid.remove(powerup)
+    
+    def save_state(self):
+        """Pack the game state into a compact bytes object; see restore_state()."""
+        player = self.player
+        carrying = player.carrying_trash
+        trash_items = self.trash_items.items
+        power_ups = self.power_ups.items
+        timers = self.timers.active()
+        glow = 0
+        for bin in self.bins:
+            glow |= bin.glow << bin.bin_type
+        version, rng_state, gauss = self.rng.getstate()
+        parts = [
+            STATE_HEADER.pack(
+                STATE_VERSION, GAME_STATES.index(self.game_state), self.slow_time, glow,
+                self.score, self.lives, self.level, self.ticks, self.timer, self.score_multiplier,
+                self.spawn_delay, self.last_spawn_tick, self.powerup_spawn_delay, self.combo_count,
+                self.max_trash, self.trash_per_spawn, self.max_power_ups, self.timers.now, self.timers.order,
+                len(trash_items), len(power_ups), len(timers), carrying is not None,
+                gauss is not None, gauss or 0.0),
+            STATE_STATS.pack(self.lives_lost, *self.correct_drops, *self.wrong_drops, *self.missed_trash),
+            STATE_PLAYER.pack(player.x, player.y, player.prev_x, player.prev_y,
+                              player.animation_frame, player.facing_right),
+            STATE_RNG.pack(*rng_state),
+        ]
+        for trash in ([carrying] if carrying else []) + trash_items:
+            parts.append(STATE_TRASH.pack(trash.x, trash.y, trash.prev_x, trash.prev_y, trash.speed,
+                                          trash.rotation, trash.rotation_speed, trash.trash_type))
+        for powerup in power_ups:
+            parts.append(STATE_POWERUP.pack(powerup.x, powerup.y, powerup.prev_x, powerup.prev_y, powerup.speed,
+                                            PowerUp.TYPES.index(powerup.type), powerup.bounce))
+        for timer in timers:
+            parts.append(STATE_TIMER.pack(timer.due, timer.priority, timer.order, *self.timer_code(timer)))
+        return b"".join(parts)
+    
+    def restore_state(self, data):
+        """Put the game back in a state from save_state().
+
+        Everything the rules depend on is restored, including the gameplay
+        RNG and pending timers, so the game continues exactly as it did from
+        that tick. Particles and their RNG stream are cosmetic and are left as
+        they are. Returns the number of bytes read.
+        """
+        view = memoryview(data)
+        (version, game_state, self.slow_time, glow, self.score, self.lives, self.level, self.ticks,
+         self.timer, self.score_multiplier, self.spawn_delay, self.last_spawn_tick, self.powerup_spawn_delay,
+         self.combo_count, self.max_trash, self.trash_per_spawn, self.max_power_ups, now, order,
+         trash_count, powerup_count, timer_count, carrying, has_gauss, gauss) = STATE_HEADER.unpack_from(view)
+        if version != STATE_VERSION:
+            raise ValueError(f"unsupported state version {version}")
+        self.game_state = GAME_STATES[game_state]
+        pos = STATE_HEADER.size
+        stats = STATE_STATS.unpack_from(view, pos)
+        self.lives_lost = stats[0]
+        self.correct_drops = list(stats[1:6])
+        self.wrong_drops = list(stats[6:11])
+        self.missed_trash = list(stats[11:16])
+        pos += STATE_STATS.size
+        player = self.player
+        (player.x, player.y, player.prev_x, player.prev_y,
+         player.animation_frame, player.facing_right) = STATE_PLAYER.unpack_from(view, pos)
+        pos += STATE_PLAYER.size
+        self.rng.setstate((3, STATE_RNG.unpack_from(view, pos), gauss if has_gauss else None))
+        pos += STATE_RNG.size
+        for bin in self.bins:
+            bin.glow = bool(glow >> bin.bin_type & 1)
+        
+        # Live entities go back to their pools and are refilled from the buffer
+        if player.carrying_trash:
+            self.trash_pool.release(player.carrying_trash)
+            player.carrying_trash = None
+        for trash in self.trash_items:
+            self.trash_pool.release(trash)
+        self.trash_items.clear()
+        self.trash_grid.clear()
+        for i in range(trash_count + carrying):
+            trash = self.trash_pool.blank()
+            (trash.x, trash.y, trash.prev_x, trash.prev_y, trash.speed,
+             trash.rotation, trash.rotation_speed, trash.trash_type) = STATE_TRASH.unpack_from(view, pos)
+            trash.width = TRASH_WIDTH
+            trash.height = TRASH_HEIGHT
+            pos += STATE_TRASH.size
+            if i < carrying:
+                player.carrying_trash = trash
+            else:
+                self.trash_items.append(trash)
+                self.trash_grid.insert(trash)
+        for powerup in self.power_ups:
+            self.powerup_pool.release(powerup)
+        self.power_ups.clear()
+        self.powerup_grid.clear()
+        for _ in range(powerup_count):
+            powerup = self.powerup_pool.blank()
+            (powerup.x, powerup.y, powerup.prev_x, powerup.prev_y, powerup.speed,
+             powerup_type, powerup.bounce) = STATE_POWERUP.unpack_from(view, pos)
+            powerup.type = PowerUp.TYPES[powerup_type]
+            powerup.width = powerup.height = 30
+            pos += STATE_POWERUP.size
+            self.power_ups.append(powerup)
+            self.powerup_grid.insert(powerup)
+        
+        self.effects = {}
+        timers = []
+        for _ in range(timer_count):
+            due, priority, timer_order, code, arg = STATE_TIMER.unpack_from(view, pos)
+            pos += STATE_TIMER.size
+            timer = Timer(due, priority, timer_order, *self.timer_callback(code, arg))
+            timers.append(timer)
+            if code == TIMER_SPAWN_TRASH:
+                self.spawn_event = timer
+            elif timer.callback == self.end_effect:
+                self.effects[timer.args[0]] = timer
+        self.timers.restore(now, order, timers)
+        return pos
+    
+    def timer_code(self, timer):
+        """(code, argument) identifying a pending timer's callback in a saved state."""
+        if timer.callback == self.end_effect:
+            effect = timer.args[0]
+            if isinstance(effect, tuple):
+                return TIMER_END_GLOW, effect[1]
+            return TIMER_CODES[effect], 0
+        return TIMER_CODES[timer.callback.__name__], timer.args[0] if timer.args else 0
+    
+    def timer_callback(self, code, arg):
+        """The (callback, args) that timer_code() encoded."""
+        if code == TIMER_SPAWN_TRASH:
+            return self.spawn_due, ()
+        if code == TIMER_SPAWN_POWERUP:
+            return self.powerup_spawn_due, ()
+        if code == TIMER_SCORE_MULTIPLIER:
+            return self.set_score_multiplier, (arg,)
+        if code == TIMER_END_SLOW_TIME:
+            return self.end_effect, ('slow_time', self.end_slow_time, ())
+        if code == TIMER_END_DOUBLE_POINTS:
+            return self.end_effect, ('double_points', self.set_score_multiplier, (1,))
+        if code == TIMER_END_COMBO:
+            return self.end_effect, ('combo', self.end_combo, ())
+        if code == TIMER_END_GLOW:
+            return self.end_effect, (('glow', arg), self.end_glow, (self.bins[arg],))
+        raise ValueError(f"unknown timer code {code}")
     
     def check_collision(self, rect1_x, rect1_y, rect1_w, rect1_h, 
                        rect2_x, rect2_y, rect2_w, rect2_h):
@@ -434,88 +1509,49 @@ class Game:
                 rect1_y < rect2_y + rect2_h and
                 rect1_y + rect1_h > rect2_y)
     
-    def update_game(self):
-        keys = pygame.key.get_pressed()
+    def tick(self, action=ACTION_NONE):
+        """Advance the rules by one tick using an explicit input action."""
+        prof = self.profiler
+        if prof:
+            prof.start()
+        if self.recorder:
+            self.recorder.record(action)
+        if action & ACTION_DROP:
+            self.handle_drop()
         
+        self.player.prev_x = self.player.x
         # Player movement
-        if keys[pygame.K_LEFT]:
+        if action & ACTION_LEFT:
             self.player.move_left()
-        if keys[pygame.K_RIGHT]:
+        if action & ACTION_RIGHT:
             self.player.move_right()
         
-        # Update timers
-        if self.slow_time_timer > 0:
-            self.slow_time_timer -= 1
-        if self.double_points_timer > 0:
-            self.double_points_timer -= 1
-            self.score_multiplier = 2
-        else:
-            self.score_multiplier = 1
+        if prof:
+            prof.lap('tick.input')
         
-        if self.combo_timer > 0:
-            self.combo_timer -= 1
-        else:
-            self.combo_count = 0
-        
-        # Spawn trash
-        self.spawn_timer += 1
-        if self.spawn_timer >= self.spawn_delay:
-            self.spawn_trash()
-            self.spawn_timer = 0
-        
-        # Spawn power-ups
-        self.powerup_spawn_timer += 1
-        if self.powerup_spawn_timer >= self.powerup_spawn_delay:
-            self.spawn_powerup()
-            self.powerup_spawn_timer = 0
-        
-        # Update trash items
-        for trash in self.trash_items[:]:
-            trash.update()
-            
-            if trash.y > SCREEN_HEIGHT - 120:
-                self.trash_items.remove(trash)
-                self.lives -= 1
-                self.combo_count = 0
-                self.create_particles(trash.x, trash.y, RED, 3)
-                if self.lives <= 0:
-                    self.game_state = "game_over"
-            
-            elif (self.player.carrying_trash is None and 
-                  self.check_collision(self.player.x, self.player.y, self.player.width, self.player.height,
-                                     trash.x, trash.y, trash.width, trash.height)):
-                self.player.carrying_trash = trash
-                self.trash_items.remove(trash)
-        
-        # Update power-ups
-        for powerup in self.power_ups[:]:
-            powerup.update()
-            
-            if powerup.y > SCREEN_HEIGHT:
-                self.power_ups.remove(powerup)
-            elif self.check_collision(self.player.x, self.player.y, self.player.width, self.player.height,
-                                    powerup.x, powerup.y, powerup.width, powerup.height):
-                self.activate_powerup(powerup)
-                self.power_ups.remove(powerup)
+        # Effects ending and spawns due this tick
+        self.timers.advance(self.ticks)
+        if prof:
+            prof.lap('tick.timers')
+        
+        self.update_trash()
+        if prof:
+            prof.lap('tick.trash')
+        self.update_power_ups()
+        if prof:
+            prof.lap('tick.power_ups')
         
         # Update particles
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.life <= 0:
-                self.particles.remove(particle)
-        
-        # Update background
-        for element in self.background_elements:
-            element['y'] += element['speed']
-            if element['y'] > SCREEN_HEIGHT:
-                element['y'] = -10
-                element['x'] = random.randint(0, SCREEN_WIDTH)
+        self.particles.update()
+        if prof:
+            prof.lap('tick.particles')
         
         # Timer countdown
         timer_speed = 1.0
-        if self.slow_time_timer > 0:
+        if self.slow_time:
             timer_speed = 0.5
         self.timer -= timer_speed / FPS
+        self.ticks += 1
         
         if self.timer <= 0:
             self.game_state = "game_over"
@@ -523,17 +1559,77 @@ class Game:
         # Level progression
         if self.score > 0 and self.score % 100 == 0:
             self.level = self.score // 100 + 1
-            self.spawn_delay = max(30, 90 - (self.level - 1) * 5)
+            self.set_spawn_delay(max(30, 90 - (self.level - 1) * 5))
+    
+    def update_trash(self):
+        # Iterate from the end so swap-remove only moves already updated items
+        trash_items = self.trash_items.items
+        for i in range(len(trash_items) - 1, -1, -1):
+            trash = trash_items[i]
+            trash.update()
+            
+            if trash.y > SCREEN_HEIGHT - 120:
+                self.remove_trash(trash)
+                self.trash_pool.release(trash)
+                self.lives -= 1
+                self.lives_lost += 1
+                self.missed_trash[trash.trash_type] += 1
+                self.combo_count = 0
+                self.create_particles(trash.x, trash.y, RED, 3)
+                if self.lives <= 0:
+                    self.game_state = "game_over"
+        
+        player = self.player
+        if player.carrying_trash is None and trash_items:
+            caught = self.trash_grid.query(player.x, player.y, player.width, player.height)
+            if caught:
+                player.carrying_trash = caught[0]
+                self.remove_trash(caught[0])
+    
+    def update_power_ups(self):
+        power_ups = self.power_ups.items
+        for i in range(len(power_ups) - 1, -1, -1):
+            powerup = power_ups[i]
+            powerup.update()
+            
+            if powerup.y > SCREEN_HEIGHT:
+                self.remove_powerup(powerup)
+                self.powerup_pool.release(powerup)
+        
+        if not power_ups:
+            return
+        player = self.player
+        for powerup in self.powerup_grid.query(player.x, player.y, player.width, player.height):
+            self.activate_powerup(powerup)
+            self.remove_powerup(powerup)
+            self.powerup_pool.release(powerup)
+    
+    def step(self, n=1, action=ACTION_NONE):
+        """Run up to n fixed ticks and return how many were simulated.
+
+        action is either an action bitmask applied on every tick or a
+        callable taking the simulation and returning one. Stepping stops
+        early once the game is over.
+        """
+        policy = action if callable(action) else None
+        for i in range(n):
+            if self.game_state != "playing":
+                return i
+            self.tick(policy(self) if policy else action)
+        return n
     
     def activate_powerup(self, powerup):
-        self.create_particles(powerup.x, powerup.y, powerup.colors[powerup.type], 8)
+        self.create_particles(powerup.x, powerup.y, PowerUp.COLORS[powerup.type], 8)
         
         if powerup.type == 'slow_time':
-            self.slow_time_timer = 300
+            self.slow_time = True
+            self.start_effect('slow_time', SLOW_TIME_TICKS, self.end_slow_time)
         elif powerup.type == 'extra_time':
             self.timer += 15
         elif powerup.type == 'double_points':
-            self.double_points_timer = 300
+            # Points double from the next tick until the tick after the effect ends
+            self.timers.schedule_at(self.ticks + 1, self.set_score_multiplier, 2, priority=PRIORITY_EFFECT)
+            self.start_effect('double_points', DOUBLE_POINTS_TICKS + 1, self.set_score_multiplier, 1)
         elif powerup.type == 'extra_life':
             self.lives += 1
     
@@ -547,49 +1643,1471 @@ class Game:
                         # Correct bin!
                         points = 10 * self.score_multiplier
                         self.combo_count += 1
-                        self.combo_timer = 180
+                        self.start_effect('combo', COMBO_TICKS, self.end_combo)
                         
                         # Combo bonus
                         if self.combo_count >= 3:
                             points += self.combo_count * 2
                         
                         self.score += points
-                        bin.glow = 30
+                        self.correct_drops[bin.bin_type] += 1
+                        bin.glow = True
+                        self.start_effect(('glow', bin.bin_type), GLOW_TICKS, self.end_glow, bin)
                         self.create_particles(bin.x + bin.width//2, bin.y, GREEN, 8)
                         
                     else:
                         # Wrong bin!
                         self.score = max(0, self.score - 5)
                         self.lives -= 1
+                        self.lives_lost += 1
+                        self.wrong_drops[self.player.carrying_trash.trash_type] += 1
                         self.combo_count = 0
                         self.create_particles(bin.x + bin.width//2, bin.y, RED, 5)
                         if self.lives <= 0:
                             self.game_state = "game_over"
                     
+                    self.trash_pool.release(self.player.carrying_trash)
                     self.player.carrying_trash = None
                     break
     
+def greedy_policy(sim):
+    """Catch the nearest trash, then walk to its bin and drop it."""
+    player = sim.player
+    center = player.x + player.width // 2
+    if player.carrying_trash:
+        target_bin = sim.bins[player.carrying_trash.trash_type]
+        target = target_bin.x + target_bin.width // 2
+        if abs(center - target) < target_bin.width // 4:
+            return ACTION_DROP
+    elif sim.trash_items:
+        lowest = max(sim.trash_items, key=lambda trash: trash.y)
+        target = lowest.x + lowest.width // 2
+    else:
+        return ACTION_NONE
+    if target < center - player.speed:
+        return ACTION_LEFT
+    if target > center + player.speed:
+        return ACTION_RIGHT
+    return ACTION_NONE
+
+# State snapshots
+# Fixed-layout records for Simulation.save_state(): a header, the player and
+# RNG state, then one record per carried trash, trash item, power-up and timer
+STATE_VERSION = 1
+GAME_STATES = ("playing", "game_over", "enter_name", "menu")
+STATE_HEADER = struct.Struct("<BB?B4idi3i5iI3I??d")
+STATE_STATS = struct.Struct("<16i")  # lives lost, then correct, wrong and missed per trash type
+STATE_PLAYER = struct.Struct("<4id?")
+STATE_RNG = struct.Struct("<625I")  # Mersenne Twister state words and position
+STATE_TRASH = struct.Struct("<ididdddB")
+STATE_POWERUP = struct.Struct("<5iBd")
+STATE_TIMER = struct.Struct("<iBIBb")
+STATE_GAME = struct.Struct("<iB")  # Game only: high score, name length, then the name
+
+# Timer callbacks by code; effect timers are coded by effect name
+TIMER_SPAWN_TRASH = 0
+TIMER_SPAWN_POWERUP = 1
+TIMER_SCORE_MULTIPLIER = 2
+TIMER_END_SLOW_TIME = 3
+TIMER_END_DOUBLE_POINTS = 4
+TIMER_END_COMBO = 5
+TIMER_END_GLOW = 6
+TIMER_CODES = {
+    'spawn_due': TIMER_SPAWN_TRASH,
+    'powerup_spawn_due': TIMER_SPAWN_POWERUP,
+    'set_score_multiplier': TIMER_SCORE_MULTIPLIER,
+    'slow_time': TIMER_END_SLOW_TIME,
+    'double_points': TIMER_END_DOUBLE_POINTS,
+    'combo': TIMER_END_COMBO,
+}
+
+class StateRing:
+    """The last few saved states, one per tick, for rewinding a simulation.
+
+    Slots are reused in a circle, so recording a state only costs the
+    save_state() call.
+    """
+    def __init__(self, capacity=FPS * 5):
+        self.states = [None] * capacity
+        self.ticks = [-1] * capacity
+    
+    def record(self, sim):
+        i = sim.ticks % len(self.states)
+        self.states[i] = sim.save_state()
+        self.ticks[i] = sim.ticks
+    
+    def get(self, tick):
+        i = tick % len(self.states)
+        return self.states[i] if self.ticks[i] == tick else None
+    
+    def rewind(self, sim, ticks):
+        """Restore sim to its state the given number of ticks ago; False if that is too old."""
+        state = self.get(sim.ticks - ticks)
+        if state is None:
+            return False
+        sim.restore_state(state)
+        return True
+
+def benchmark_snapshots(ticks=FPS * 60, seed=0, swarm=0, rewind=FPS):
+    """Time save_state()/restore_state() per tick against copy.deepcopy, and check rollback.
+
+    Every tick of a greedy game is recorded into a StateRing. Every rewind
+    ticks the game is rolled back rewind ticks and replayed with the same
+    actions, which must land on exactly the same state.
+    """
+    sim = Simulation(seed, swarm=swarm)
+    sim.lives = 1000  # keep playing so the whole run is measured
+    ring = StateRing(rewind + 1)
+    actions = []
+    save_ns = restore_ns = 0
+    saves = restores = 0
+    mismatches = 0
+    size = 0
+    while sim.ticks < ticks and sim.game_state == "playing":
+        start = time.perf_counter_ns()
+        ring.record(sim)
+        save_ns += time.perf_counter_ns() - start
+        saves += 1
+        size = max(size, len(ring.get(sim.ticks)))
+        action = greedy_policy(sim)
+        actions.append(action)
+        sim.tick(action)
+        if sim.ticks % rewind == 0:
+            expected = sim.save_state()
+            start = time.perf_counter_ns()
+            ring.rewind(sim, rewind)
+            restore_ns += time.perf_counter_ns() - start
+            restores += 1
+            for action in actions[-rewind:]:
+                sim.tick(action)
+            mismatches += sim.save_state() != expected
+    
+    start = time.perf_counter_ns()
+    for _ in range(100):
+        copy.deepcopy(sim)
+    deepcopy_ns = (time.perf_counter_ns() - start) / 100
+    return {
+        'ticks': sim.ticks,
+        'save_us': save_ns / saves / 1000,
+        'restore_us': restore_ns / max(restores, 1) / 1000,
+        'deepcopy_us': deepcopy_ns / 1000,
+        'bytes': size,
+        'rollbacks': restores,
+        'mismatches': mismatches,
+    }
+
+# Replays
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+class InputRecorder:
+    """Records one game's per-tick actions as a compact binary log.
+
+    Layout: header (magic, version, seed, swarm), then runs of identical
+    actions as varints of (run_length << 3 | action), a 0 terminator, and a
+    trailer with the final tick count, score and lives for verification.
+    Held keys repeat for many ticks, so a minute of play is usually a few
+    hundred bytes.
+    """
+    MAGIC = b"TTRP"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBQI")
+    TRAILER = struct.Struct("<Iii")
+    
+    def __init__(self, seed, swarm=0):
+        self.seed = seed
+        self.swarm = swarm
+        self.runs = bytearray()
+        self.action = None
+        self.run_length = 0
+    
+    def record(self, action):
+        if action == self.action:
+            self.run_length += 1
+            return
+        self.flush_run()
+        self.action = action
+        self.run_length = 1
+    
+    def flush_run(self):
+        if self.run_length:
+            write_varint(self.runs, self.run_length << 3 | self.action)
+    
+    def to_bytes(self, sim):
+        self.flush_run()
+        self.action = None
+        self.run_length = 0
+        return (self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, self.swarm) + self.runs + b"\0" +
+                self.TRAILER.pack(sim.ticks, sim.score, sim.lives))
+    
+    def save(self, path, sim):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes(sim))
+
+class Replay:
+    """A recorded game that can be re-simulated headless and seeked by tick."""
+    def __init__(self, seed, swarm, actions, ticks, score, lives):
+        self.seed = seed
+        self.swarm = swarm
+        self.actions = actions  # one action byte per tick
+        self.ticks = ticks
+        self.score = score
+        self.lives = lives
+        self.snapshots = []
+    
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, swarm = InputRecorder.HEADER.unpack_from(data)
+        if magic != InputRecorder.MAGIC or version != InputRecorder.VERSION:
+            raise ValueError("Not a Trash Trouble replay (or an unsupported version)")
+        pos = InputRecorder.HEADER.size
+        actions = bytearray()
+        while True:
+            value, pos = read_varint(data, pos)
+            if not value:
+                break
+            actions.extend(bytes([value & 7]) * (value >> 3))
+        ticks, score, lives = InputRecorder.TRAILER.unpack_from(data, pos)
+        return cls(seed, swarm, actions, ticks, score, lives)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+    
+    def new_simulation(self):
+        return Simulation(self.seed, swarm=self.swarm)
+    
+    def advance(self, sim, tick):
+        """Step sim forward to the given tick using the recorded actions."""
+        actions = self.actions
+        tick_method = sim.tick
+        for i in range(sim.ticks, min(tick, len(actions))):
+            tick_method(actions[i])
+        return sim
+    
+    def play(self):
+        """Re-simulate the whole game at full speed and return the final state."""
+        return self.advance(self.new_simulation(), len(self.actions))
+    
+    def verify(self):
+        sim = self.play()
+        return (sim.ticks, sim.score, sim.lives) == (self.ticks, self.score, self.lives)
+    
+    def build_snapshots(self, interval=FPS * 10):
+        """Play through once, saving the state every interval ticks."""
+        sim = self.new_simulation()
+        self.snapshots = [(0, sim.save_state())]
+        for tick in range(interval, len(self.actions), interval):
+            self.advance(sim, tick)
+            self.snapshots.append((sim.ticks, sim.save_state()))
+    
+    def seek(self, tick):
+        """State after the given number of ticks, resumed from the nearest snapshot."""
+        if not self.snapshots:
+            self.build_snapshots()
+        start = self.snapshots[0][1]
+        for snapshot_tick, state in self.snapshots:
+            if snapshot_tick > tick:
+                break
+            start = state
+        sim = self.new_simulation()
+        sim.restore_state(start)
+        return self.advance(sim, tick)
+
+def idle_policy(sim):
+    return ACTION_NONE
+
+class RandomPolicy:
+    """Mashes keys at random; seeded so tournament games stay reproducible."""
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+    
+    def __call__(self, sim):
+        return self.rng.randrange(8)
+
+POLICIES = {
+    'greedy': greedy_policy,
+    'idle': idle_policy,
+    'random': RandomPolicy,
+}
+
+def resolve_policy(name, seed=None):
+    """Look up a bot policy by registry name or "module:callable" path.
+
+    Classes (like RandomPolicy) are instantiated with the game seed.
+    """
+    if name in POLICIES:
+        policy = POLICIES[name]
+    else:
+        module_name, _, attr = name.partition(':')
+        if not attr:
+            raise ValueError(f"Unknown policy {name!r}; use one of {sorted(POLICIES)} or module:callable")
+        policy = getattr(importlib.import_module(module_name), attr)
+    if isinstance(policy, type):
+        policy = policy(seed)
+    return policy
+
+def play_tournament_game(task):
+    policy_name, seed, max_ticks = task
+    sim = Simulation(seed)
+    sim.step(max_ticks, resolve_policy(policy_name, seed))
+    return {
+        'policy': policy_name,
+        'seed': seed,
+        'score': sim.score,
+        'level': sim.level,
+        'ticks': sim.ticks,
+        'lives_lost': sim.lives_lost,
+        'correct_drops': sim.correct_drops,
+        'wrong_drops': sim.wrong_drops,
+        'missed_trash': sim.missed_trash,
+    }
+
+class TournamentSummary:
+    """Running aggregate of tournament game results for one policy."""
+    def __init__(self, policy):
+        self.policy = policy
+        self.games = 0
+        self.ticks = 0
+        self.scores = []
+        self.levels = {}
+        self.lives_lost = 0
+        self.correct_drops = [0] * 5
+        self.wrong_drops = [0] * 5
+        self.missed_trash = [0] * 5
+    
+    def add(self, result):
+        self.games += 1
+        self.ticks += result['ticks']
+        self.scores.append(result['score'])
+        self.levels[result['level']] = self.levels.get(result['level'], 0) + 1
+        self.lives_lost += result['lives_lost']
+        for totals, key in ((self.correct_drops, 'correct_drops'), (self.wrong_drops, 'wrong_drops'),
+                            (self.missed_trash, 'missed_trash')):
+            for trash_type, count in enumerate(result[key]):
+                totals[trash_type] += count
+    
+    def as_dict(self):
+        scores = sorted(self.scores)
+        return {
+            'policy': self.policy,
+            'games': self.games,
+            'ticks': self.ticks,
+            'score_mean': sum(scores) / len(scores) if scores else 0,
+            'score_median': scores[len(scores) // 2] if scores else 0,
+            'score_min': scores[0] if scores else 0,
+            'score_max': scores[-1] if scores else 0,
+            'levels': dict(sorted(self.levels.items())),
+            'lives_lost_mean': self.lives_lost / self.games if self.games else 0,
+            'correct_drops': dict(zip(TRASH_NAMES, self.correct_drops)),
+            'wrong_drops': dict(zip(TRASH_NAMES, self.wrong_drops)),
+            'missed_trash': dict(zip(TRASH_NAMES, self.missed_trash)),
+        }
+
+def run_tournament(games, policies=('greedy',), seed=0, processes=None, max_ticks=FPS * 600):
+    """Play seeded games for each policy across a process pool.
+
+    Every policy plays the same seeds. Results stream back unordered and are
+    folded into one TournamentSummary per policy.
+    """
+    for policy in policies:
+        resolve_policy(policy)  # fail fast on unknown names, before starting workers
+    summaries = {policy: TournamentSummary(policy) for policy in policies}
+    tasks = [(policy, seed + i, max_ticks) for policy in policies for i in range(games)]
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (processes * 16))
+    # Spawned workers start clean instead of inheriting SDL threads and locks through fork
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        for result in pool.imap_unordered(play_tournament_game, tasks, chunksize):
+            summaries[result['policy']].add(result)
+        # SDL turns SIGTERM into a quit event, so let workers exit instead of terminate()
+        pool.close()
+        pool.join()
+    return summaries
+
+def benchmark_simulation(ticks=100000, seed=0, policy=greedy_policy):
+    """Run headless games back to back and report simulated ticks per second."""
+    sim = Simulation(seed)
+    games = 1
+    done = 0
+    start = time.perf_counter()
+    while done < ticks:
+        done += sim.step(ticks - done, policy)
+        if done < ticks:
+            sim = Simulation(seed + games)
+            games += 1
+    elapsed = time.perf_counter() - start
+    return {
+        'ticks': done,
+        'games': games,
+        'seconds': elapsed,
+        'ticks_per_second': done / elapsed if elapsed else float('inf'),
+    }
+
+# Scene layers
+class SceneCompositor:
+    """Layered background: a cached static layer plus scrolling dot layers.
+
+    The sky and the bins without glow are baked into `playfield`, rebuilt
+    only after invalidate(). The floating dots live on a few screen-sized,
+    vertically tileable layers with an RLE colour key, so each layer costs
+    two offset blits per frame instead of a draw call per dot. Slower layers
+    hold smaller dots for a parallax effect. A keyed copy of the bins is
+    blitted last so the bins stay in front of the dots.
+    """
+    LAYERS = ((0.5, 2, 5), (1.0, 3, 5), (1.5, 4, 5))  # (pixels per tick, dot radius, dots)
+    COLOR_KEY = (255, 0, 255)
+    
+    def __init__(self, game, rng=random):
+        self.game = game
+        self.layers = []  # (speed, radius, surface, [(x, y)])
+        for speed, radius, count in self.LAYERS:
+            dots = [(rng.randint(0, SCREEN_WIDTH), rng.randint(0, SCREEN_HEIGHT)) for _ in range(count)]
+            self.layers.append((speed, radius, self.bake_layer(radius, dots), dots))
+        self.playfield = None
+        self.bins_overlay = None
+    
+    def bake_layer(self, radius, dots):
+        # Baked at the game's render scale, like every surface blitted on its canvas
+        layer = Canvas.blank((SCREEN_WIDTH, SCREEN_HEIGHT), self.game.screen.scale)
+        layer.fill(self.COLOR_KEY)
+        for x, y in dots:
+            # Dots crossing the bottom edge also appear at the top so the layer tiles
+            for tile_y in (y - SCREEN_HEIGHT, y, y + SCREEN_HEIGHT):
+                layer.circle(WHITE, (x, tile_y), radius)
+        layer.surface.set_colorkey(self.COLOR_KEY, pygame.RLEACCEL)
+        return layer.surface
+    
+    def invalidate(self):
+        self.playfield = None
+    
+    def build_static(self):
+        screen = self.game.screen
+        playfield = Canvas(pygame.Surface(screen.surface.get_size()).convert(), screen.scale)
+        playfield.fill(SKY_BLUE)
+        bins_overlay = Canvas(pygame.Surface(screen.surface.get_size()).convert(), screen.scale)
+        bins_overlay.fill(self.COLOR_KEY)
+        for bin in self.game.bins:
+            glow = bin.glow
+            bin.glow = False
+            bin.draw(playfield)
+            bin.draw(bins_overlay)
+            bin.glow = glow
+        self.playfield = playfield.surface
+        self.bins_overlay = bins_overlay.surface
+        self.bins_overlay.set_colorkey(self.COLOR_KEY, pygame.RLEACCEL)
+        self.bins_area = pygame.Rect(0, self.game.bins[0].y - 5, SCREEN_WIDTH, BIN_HEIGHT + 10)
+    
+    def offset(self, speed, tick=None):
+        if tick is None:
+            tick = self.game.ticks
+        return int(tick * speed) % SCREEN_HEIGHT
+    
+    def draw_layers(self, screen, tick=None):
+        for speed, radius, layer, dots in self.layers[:self.game.quality.layers]:
+            offset = self.offset(speed, tick)
+            screen.blit(layer, (0, offset))
+            screen.blit(layer, (0, offset - SCREEN_HEIGHT))
+    
+    def draw_sky(self, screen):
+        """Sky and dots, for the menu screens."""
+        screen.fill(SKY_BLUE)
+        self.draw_layers(screen)
+    
+    def draw_playfield(self, screen, tick=None):
+        """Sky, dots and the bins without glow, with the dots scrolled to tick."""
+        if self.playfield is None:
+            self.build_static()
+        screen.blit(self.playfield, (0, 0))
+        self.draw_layers(screen, tick)
+        screen.blit(self.bins_overlay, self.bins_area, self.bins_area)
+    
+    def dot_rects(self):
+        """Screen rects of every dot at the current scroll offsets."""
+        rects = []
+        slack = self.game.screen.slack
+        for speed, radius, layer, dots in self.layers[:self.game.quality.layers]:
+            offset = self.offset(speed)
+            reach = radius + slack
+            for x, y in dots:
+                y = (y + offset) % SCREEN_HEIGHT
+                rects.append(pygame.Rect(x - reach, y - reach, reach * 2 + 1, reach * 2 + 1))
+                if y + reach >= SCREEN_HEIGHT:
+                    rects.append(pygame.Rect(x - reach, y - SCREEN_HEIGHT - reach, reach * 2 + 1, reach * 2 + 1))
+                elif y - reach < 0:
+                    rects.append(pygame.Rect(x - reach, y + SCREEN_HEIGHT - reach, reach * 2 + 1, reach * 2 + 1))
+        return rects
+
+# Profiling
+def percentiles(samples, quantiles=(0.5, 0.95, 0.99)):
+    samples = sorted(samples)
+    last = len(samples) - 1
+    return tuple(samples[int(last * q + 0.5)] for q in quantiles)
+
+class FrameProfiler:
+    """Per-phase frame timings from perf_counter_ns laps.
+    
+    Code being measured calls start() and then lap(phase) at the end of each
+    phase. Callers hold the profiler in an attribute that is None while
+    profiling is off, so the disabled cost is one truthiness test per phase.
+    Rolling windows feed the overlay; every sample is also kept for export.
+    """
+    OVERLAY_REFRESH = 30  # frames between overlay rebuilds
+    
+    def __init__(self, window=FPS * 5):
+        self.window = window
+        self.recent = {}  # phase -> deque of the last window samples (ns)
+        self.raw = {}     # phase -> (array of frame numbers, array of samples)
+        self.frame = 0
+        self.laps = threading.local()  # lap start per thread, for the threaded simulation
+        self.overlay = None
+        self.overlay_frame = -self.OVERLAY_REFRESH
+    
+    def start(self):
+        self.laps.last = time.perf_counter_ns()
+    
+    def lap(self, phase):
+        now = time.perf_counter_ns()
+        elapsed = now - self.laps.last
+        self.laps.last = now
+        recent = self.recent.get(phase)
+        if recent is None:
+            recent = self.recent[phase] = deque(maxlen=self.window)
+            self.raw[phase] = (array('I'), array('q'))
+        recent.append(elapsed)
+        frames, samples = self.raw[phase]
+        frames.append(self.frame)
+        samples.append(elapsed)
+    
+    def end_frame(self):
+        self.frame += 1
+    
+    def percentiles(self, phase):
+        """Rolling p50, p95 and p99 for a phase in milliseconds."""
+        return tuple(value / 1e6 for value in percentiles(self.recent[phase]))
+    
+    def summary(self):
+        """Rolling p50, p95 and p99 in milliseconds for every phase."""
+        return {phase: dict(zip(('p50', 'p95', 'p99'), self.percentiles(phase))) for phase in self.recent}
+    
+    def export(self, path):
+        """Write every raw sample to CSV, or JSON when path ends in .json."""
+        if path.endswith('.json'):
+            data = {phase: {'frames': list(frames), 'ns': list(samples)}
+                    for phase, (frames, samples) in self.raw.items()}
+            with open(path, 'w') as f:
+                json.dump(data, f)
+            return
+        with open(path, 'w') as f:
+            f.write("frame,phase,ns\n")
+            for phase, (frames, samples) in self.raw.items():
+                for frame, sample in zip(frames, samples):
+                    f.write(f"{frame},{phase},{sample}\n")
+    
+    def draw_overlay(self, screen, counts):
+        """Draw the stats panel, rebuilding it only every OVERLAY_REFRESH frames."""
+        if self.frame - self.overlay_frame >= self.OVERLAY_REFRESH or self.overlay is None:
+            self.overlay_frame = self.frame
+            # Rendered straight from the font: these strings change every rebuild
+            # and would only churn the shared text cache
+            font = text_cache.font(18)
+            rows = [("phase (ms)", "p50", "p95", "p99")]
+            for phase in self.recent:
+                rows.append((phase,) + tuple(f"{value:.3f}" for value in self.percentiles(phase)))
+            
+            line_height = font.get_linesize()
+            self.overlay = pygame.Surface((300, line_height * (len(rows) + 1) + 10), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 170))
+            for i, row in enumerate(rows):
+                y = 5 + i * line_height
+                self.overlay.blit(font.render(row[0], True, WHITE), (6, y))
+                # Right-align the numbers in fixed columns
+                for column, value in enumerate(row[1:]):
+                    text = font.render(value, True, WHITE)
+                    self.overlay.blit(text, (180 + column * 55 - text.get_width(), y))
+            counts_text = "  ".join(f"{name}: {count}" for name, count in counts)
+            self.overlay.blit(font.render(counts_text, True, YELLOW), (6, 5 + len(rows) * line_height))
+        screen.blit(screen.scaled(self.overlay), (SCREEN_WIDTH - self.overlay.get_width() - 10, 80))
+
+# Adaptive quality
+Quality = namedtuple('Quality', [
+    'particles',  # share of each particle burst that is emitted
+    'layers',     # background dot layers drawn
+    'glow',       # glow around bins after a correct drop
+    'bounce',     # power-up bounce
+    'bob',        # robot bobbing while walking
+])
+
+# Best first; the governor steps one level at a time
+QUALITY_LEVELS = (
+    Quality(1.0, 3, True, True, True),
+    Quality(0.5, 2, True, True, False),
+    Quality(0.25, 1, True, False, False),
+    Quality(0.0, 0, False, False, False),
+)
+
+class QualityGovernor:
+    """Steps effect quality down when frames overrun their budget and back up with headroom.
+
+    add() takes the time each frame spent working (not sleeping). Once a
+    window of samples is in, its 90th percentile is compared with the frame
+    budget: over DOWNGRADE drops a level, under UPGRADE raises one. The gap
+    between the two thresholds, a fresh window after every change and an
+    upgrade wait that doubles whenever an upgrade has to be taken back keep
+    the level from flipping back and forth.
+    """
+    DOWNGRADE = 0.9
+    UPGRADE = 0.5
+    MAX_UPGRADE_WAIT = FPS * 300
+    
+    def __init__(self, budget=TICK_SECONDS, window=FPS, level=0):
+        self.budget = budget
+        self.samples = deque(maxlen=window)
+        self.level = level
+        self.upgrade_wait = window * 2  # frames of headroom needed before going up
+        self.calm = 0
+        self.last_change = 0  # +1 after a downgrade, -1 after an upgrade
+        self.changes = 0
+    
+    @property
+    def quality(self):
+        return QUALITY_LEVELS[self.level]
+    
+    def add(self, seconds):
+        """Record a frame's work time; returns True when the level changed."""
+        samples = self.samples
+        samples.append(seconds)
+        if len(samples) < samples.maxlen:
+            return False
+        load = percentiles(samples, (0.9,))[0] / self.budget
+        if load > self.DOWNGRADE and self.level < len(QUALITY_LEVELS) - 1:
+            if self.last_change < 0:
+                # The last upgrade did not fit; wait longer before trying it again
+                self.upgrade_wait = min(self.upgrade_wait * 2, self.MAX_UPGRADE_WAIT)
+            self.change(1)
+            return True
+        self.calm = self.calm + 1 if load < self.UPGRADE else 0
+        if self.calm >= self.upgrade_wait and self.level > 0:
+            self.change(-1)
+            return True
+        return False
+    
+    def change(self, step):
+        self.level += step
+        self.last_change = step
+        self.changes += 1
+        self.samples.clear()
+        self.calm = 0
+
+class DirtyRectRenderer:
+    """Redraws only the parts of the playfield that changed since the last frame.
+
+    Each frame the previous and current rects of moving entities are restored
+    from the scene's static playfield layer, the dynamic layers are drawn on
+    top, and only those rects are returned for pygame.display.update().
+    """
+    HUD_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, 85)
+    
+    def __init__(self, game):
+        self.game = game
+        self.previous = []
+        self.hud_state = None
+        self.full_redraw = True
+    
+    def invalidate(self):
+        self.full_redraw = True
+    
+    def draw(self):
+        game = self.game
+        screen = game.screen
+        scene = game.scene
+        if scene.playfield is None:
+            scene.build_static()
+        background = scene.playfield
+        
+        current = game.entity_rects()
+        hud_state = game.hud_state()
+        
+        screen_rect = screen.get_rect()
+        if self.full_redraw:
+            dirty = [screen_rect]
+        else:
+            dirty = [rect.clip(screen_rect) for rect in self.previous + current]
+            dirty = [rect for rect in dirty if rect.width and rect.height]
+        
+        # Anti-aliased text darkens if blitted over itself, so the HUD band is
+        # restored as a whole whenever its text changes or something crosses it
+        redraw_hud = hud_state != self.hud_state or self.HUD_RECT.collidelist(dirty) != -1
+        if redraw_hud and not self.full_redraw:
+            dirty.append(self.HUD_RECT)
+        
+        for rect in dirty:
+            screen.blit(background, rect, rect)
+        
+        # Same layer order as Game.draw_game; the layer blits only change
+        # pixels under dots and bins, which are all inside dirty rects
+        scene.draw_layers(screen)
+        screen.blit(scene.bins_overlay, scene.bins_area, scene.bins_area)
+        for bin in game.glowing_bins():
+            bin.draw(screen)
+        game.draw_entities()
+        if redraw_hud:
+            game.draw_ui()
+        
+        self.previous = current
+        self.hud_state = hud_state
+        self.full_redraw = False
+        return dirty
+
+def benchmark_collisions(counts=(10, 100, 1000, 10000), ticks=60, seed=0):
+    """Time the trash update and player collision pass against the list-based original."""
+    def fill(sim, count):
+        rng = random.Random(seed)
+        items = []
+        for _ in range(count):
+            trash = TrashItem(rng=rng)
+            trash.y = rng.uniform(-TRASH_HEIGHT, SCREEN_HEIGHT - 300)
+            items.append(trash)
+        return items
+    
+    def list_pass(sim, items):
+        # The original loop: scalar check_collision and list.remove on a copy
+        player = sim.player
+        for trash in items[:]:
+            trash.update()
+            if trash.y > SCREEN_HEIGHT - 120:
+                items.remove(trash)
+            elif (player.carrying_trash is None and
+                  sim.check_collision(player.x, player.y, player.width, player.height,
+                                      trash.x, trash.y, trash.width, trash.height)):
+                items.remove(trash)
+    
+    results = {}
+    for count in counts:
+        sim = Simulation(seed)
+        items = fill(sim, count)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            list_pass(sim, items)
+        list_ms = (time.perf_counter() - start) / ticks * 1000
+        
+        sim = Simulation(seed, swarm=count)
+        for trash in fill(sim, count):
+            sim.trash_items.append(trash)
+            sim.trash_grid.insert(trash)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            sim.update_trash()
+            sim.player.carrying_trash = None
+        grid_ms = (time.perf_counter() - start) / ticks * 1000
+        results[count] = {'list': list_ms, 'store': grid_ms}
+    return results
+
+class BatchSimulation:
+    """N independent games advanced together on NumPy arrays.
+
+    Follows the rules of Simulation.tick (default entity caps) exactly,
+    including the store order that decides which trash is caught first.
+    Every game has its own random.Random seeded like Simulation, so game i
+    matches Simulation(seeds[i]) tick for tick. Only spawns touch the RNGs,
+    and they happen every spawn_delay ticks, so they are handled per game.
+    """
+    PLAYER_Y = SCREEN_HEIGHT - 200
+    GROUND_Y = SCREEN_HEIGHT - 120
+    
+    def __init__(self, seeds):
+        if np is None:
+            raise ImportError("BatchSimulation requires NumPy")
+        n = len(seeds)
+        self.n = n
+        self.rngs = []
+        for seed in seeds:
+            rng = random.Random(seed)
+            rng.getrandbits(64)  # keep in step with Simulation's effects stream seed
+            self.rngs.append(rng)
+        
+        def ints(value):
+            return np.full(n, value, np.int64)
+        
+        self.game_over = np.zeros(n, bool)
+        self.player_x = ints(SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2)
+        self.carrying = ints(-1)  # trash type carried, -1 for none
+        self.score = ints(0)
+        self.lives = ints(3)
+        self.level = ints(1)
+        self.timer = np.full(n, 180.0)
+        self.ticks = ints(0)
+        self.slow_time_timer = ints(0)
+        self.double_points_timer = ints(0)
+        self.score_multiplier = ints(1)
+        self.spawn_timer = ints(0)
+        self.spawn_delay = ints(90)
+        self.powerup_spawn_timer = ints(0)
+        self.powerup_spawn_delay = 600
+        self.combo_count = ints(0)
+        self.combo_timer = ints(0)
+        
+        # Entity slots in EntityStore order; the first *_count slots are live
+        self.trash_count = ints(0)
+        self.trash_x = np.zeros((n, MAX_TRASH), np.int64)
+        self.trash_y = np.zeros((n, MAX_TRASH))
+        self.trash_speed = np.zeros((n, MAX_TRASH))
+        self.trash_type = np.zeros((n, MAX_TRASH), np.int64)
+        self.trash_arrays = (self.trash_x, self.trash_y, self.trash_speed, self.trash_type)
+        self.powerup_count = ints(0)
+        self.powerup_x = np.zeros((n, MAX_POWER_UPS), np.int64)
+        self.powerup_y = np.zeros((n, MAX_POWER_UPS))
+        self.powerup_type = np.zeros((n, MAX_POWER_UPS), np.int64)
+        self.powerup_arrays = (self.powerup_x, self.powerup_y, self.powerup_type)
+        
+        bin_spacing = SCREEN_WIDTH // 6
+        self.bin_x = [bin_spacing * (i + 1) - BIN_WIDTH // 2 for i in range(5)]
+    
+    def tick(self, actions):
+        """Advance every running game by one tick; actions is an (N,) bitmask array."""
+        playing = ~self.game_over
+        actions = np.where(playing, actions, ACTION_NONE)
+        
+        drop = playing & ((actions & ACTION_DROP) != 0) & (self.carrying >= 0)
+        if drop.any():
+            self.handle_drop(drop)
+        
+        # Player movement
+        left = playing & ((actions & ACTION_LEFT) != 0) & (self.player_x > 0)
+        self.player_x[left] -= PLAYER_SPEED
+        right = playing & ((actions & ACTION_RIGHT) != 0) & (self.player_x < SCREEN_WIDTH - PLAYER_WIDTH)
+        self.player_x[right] += PLAYER_SPEED
+        
+        # Update timers
+        self.slow_time_timer[playing & (self.slow_time_timer > 0)] -= 1
+        doubled = playing & (self.double_points_timer > 0)
+        self.double_points_timer[doubled] -= 1
+        self.score_multiplier[playing] = np.where(doubled, 2, 1)[playing]
+        combo_running = playing & (self.combo_timer > 0)
+        self.combo_timer[combo_running] -= 1
+        self.combo_count[playing & ~combo_running] = 0
+        
+        # Spawns
+        self.spawn_timer[playing] += 1
+        due = playing & (self.spawn_timer >= self.spawn_delay)
+        for i in np.flatnonzero(due).tolist():
+            self.spawn_trash(i)
+        self.spawn_timer[due] = 0
+        
+        self.powerup_spawn_timer[playing] += 1
+        due = playing & (self.powerup_spawn_timer >= self.powerup_spawn_delay)
+        for i in np.flatnonzero(due).tolist():
+            self.spawn_powerup(i)
+        self.powerup_spawn_timer[due] = 0
+        
+        self.update_trash(playing)
+        self.update_power_ups(playing)
+        
+        # Timer countdown
+        timer_speed = np.where(self.slow_time_timer > 0, 0.5, 1.0)
+        self.timer[playing] -= timer_speed[playing] / FPS
+        self.ticks[playing] += 1
+        self.game_over |= playing & (self.timer <= 0)
+        
+        # Level progression
+        level_up = playing & (self.score > 0) & (self.score % 100 == 0)
+        self.level[level_up] = self.score[level_up] // 100 + 1
+        self.spawn_delay[level_up] = np.maximum(30, 90 - (self.level[level_up] - 1) * 5)
+    
+    def step(self, n=1, actions=ACTION_NONE):
+        """Run up to n ticks; actions is a bitmask, an (N,) array or a callable returning one."""
+        for i in range(n):
+            if self.game_over.all():
+                return i
+            self.tick(actions(self) if callable(actions) else actions)
+        return n
+    
+    def handle_drop(self, drop):
+        center = self.player_x + PLAYER_WIDTH // 2
+        bin_type = np.full(self.n, -1, np.int64)
+        for i, x in enumerate(self.bin_x):
+            bin_type[(bin_type < 0) & (center >= x) & (center <= x + BIN_WIDTH)] = i
+        drop &= bin_type >= 0
+        correct = drop & (self.carrying == bin_type)
+        wrong = drop & ~correct
+        
+        # Correct bin!
+        points = 10 * self.score_multiplier
+        self.combo_count[correct] += 1
+        self.combo_timer[correct] = 180
+        points = points + np.where(self.combo_count >= 3, self.combo_count * 2, 0)
+        self.score[correct] += points[correct]
+        
+        # Wrong bin!
+        self.score[wrong] = np.maximum(0, self.score[wrong] - 5)
+        self.lives[wrong] -= 1
+        self.combo_count[wrong] = 0
+        self.game_over |= wrong & (self.lives <= 0)
+        
+        self.carrying[drop] = -1
+    
+    def swap_remove(self, arrays, counts, rows, slots):
+        last = counts[rows] - 1
+        for array in arrays:
+            array[rows, slots] = array[rows, last]
+        counts[rows] -= 1
+    
+    def spawn_trash(self, i):
+        if self.trash_count[i] >= MAX_TRASH:
+            return
+        rng = self.rngs[i]
+        # Same draws, in the same order, as TrashItem.__init__
+        x = rng.randint(50, SCREEN_WIDTH - TRASH_WIDTH - 50)
+        rng.uniform(-2, 2)
+        trash_type = rng.randint(0, 4)
+        speed_multiplier = 1.0
+        if self.slow_time_timer[i] > 0:
+            speed_multiplier = 0.5
+        slot = self.trash_count[i]
+        self.trash_x[i, slot] = x
+        self.trash_y[i, slot] = -TRASH_HEIGHT
+        self.trash_speed[i, slot] = (TRASH_SPEED + (int(self.level[i]) - 1) * 0.2) * speed_multiplier
+        self.trash_type[i, slot] = trash_type
+        self.trash_count[i] += 1
+    
+    def spawn_powerup(self, i):
+        rng = self.rngs[i]
+        if self.powerup_count[i] < MAX_POWER_UPS and rng.random() < 0.2:
+            slot = self.powerup_count[i]
+            self.powerup_x[i, slot] = rng.randint(50, SCREEN_WIDTH - 50)
+            self.powerup_y[i, slot] = -30
+            self.powerup_type[i, slot] = PowerUp.TYPES.index(rng.choice(PowerUp.TYPES))
+            self.powerup_count[i] += 1
+    
+    def update_trash(self, playing):
+        slots = np.arange(MAX_TRASH)
+        live = playing[:, None] & (slots < self.trash_count[:, None])
+        self.trash_y += np.where(live, self.trash_speed, 0.0)
+        
+        # Ground hits, swap-removed from the last slot down like Simulation.update_trash
+        grounded = live & (self.trash_y > self.GROUND_Y)
+        if grounded.any():
+            for slot in range(MAX_TRASH - 1, -1, -1):
+                rows = np.flatnonzero(grounded[:, slot])
+                if rows.size:
+                    self.swap_remove(self.trash_arrays, self.trash_count, rows, slot)
+                    self.lives[rows] -= 1
+                    self.combo_count[rows] = 0
+            self.game_over |= grounded.any(axis=1) & (self.lives <= 0)
+        
+        # Catch the first overlapping trash in store order
+        free = playing & (self.carrying < 0) & (self.trash_count > 0)
+        if not free.any():
+            return
+        x = self.player_x[:, None]
+        overlap = (free[:, None] & (slots < self.trash_count[:, None]) &
+                   (x < self.trash_x + TRASH_WIDTH) & (x + PLAYER_WIDTH > self.trash_x) &
+                   (self.PLAYER_Y < self.trash_y + TRASH_HEIGHT) &
+                   (self.PLAYER_Y + PLAYER_HEIGHT > self.trash_y))
+        rows = np.flatnonzero(overlap.any(axis=1))
+        if rows.size:
+            caught = overlap[rows].argmax(axis=1)
+            self.carrying[rows] = self.trash_type[rows, caught]
+            self.swap_remove(self.trash_arrays, self.trash_count, rows, caught)
+    
+    def update_power_ups(self, playing):
+        slots = np.arange(MAX_POWER_UPS)
+        live = playing[:, None] & (slots < self.powerup_count[:, None])
+        if not live.any():
+            return
+        self.powerup_y += np.where(live, 3.0, 0.0)
+        
+        fallen = live & (self.powerup_y > SCREEN_HEIGHT)
+        for slot in range(MAX_POWER_UPS - 1, -1, -1):
+            rows = np.flatnonzero(fallen[:, slot])
+            if rows.size:
+                self.swap_remove(self.powerup_arrays, self.powerup_count, rows, slot)
+        
+        x = self.player_x[:, None]
+        overlap = (playing[:, None] & (slots < self.powerup_count[:, None]) &
+                   (x < self.powerup_x + 30) & (x + PLAYER_WIDTH > self.powerup_x) &
+                   (self.PLAYER_Y < self.powerup_y + 30) &
+                   (self.PLAYER_Y + PLAYER_HEIGHT > self.powerup_y))
+        # Collected power-ups are rare, so apply them one game at a time in store order
+        for i in np.flatnonzero(overlap.any(axis=1)).tolist():
+            collected = [(int(self.powerup_x[i, s]), float(self.powerup_y[i, s]), int(self.powerup_type[i, s]))
+                         for s in np.flatnonzero(overlap[i]).tolist()]
+            for powerup in collected:
+                self.activate_powerup(i, powerup[2])
+                count = self.powerup_count[i]
+                stored = [(int(self.powerup_x[i, s]), float(self.powerup_y[i, s]), int(self.powerup_type[i, s]))
+                          for s in range(count)]
+                self.swap_remove(self.powerup_arrays, self.powerup_count,
+                                 np.array([i]), np.array([stored.index(powerup)]))
+    
+    def activate_powerup(self, i, powerup_type):
+        name = PowerUp.TYPES[powerup_type]
+        if name == 'slow_time':
+            self.slow_time_timer[i] = 300
+        elif name == 'extra_time':
+            self.timer[i] += 15
+        elif name == 'double_points':
+            self.double_points_timer[i] = 300
+        elif name == 'extra_life':
+            self.lives[i] += 1
+
+def batch_state(batch, i):
+    """Rule-relevant state of one batch game, in the same shape as simulation_state()."""
+    return {
+        'game_over': bool(batch.game_over[i]),
+        'score': int(batch.score[i]),
+        'lives': int(batch.lives[i]),
+        'level': int(batch.level[i]),
+        'timer': float(batch.timer[i]),
+        'combo': (int(batch.combo_count[i]), int(batch.combo_timer[i])),
+        'effects': (int(batch.slow_time_timer[i]), int(batch.double_points_timer[i])),
+        'player_x': int(batch.player_x[i]),
+        'carrying': int(batch.carrying[i]),
+        'trash': [(int(batch.trash_x[i, s]), float(batch.trash_y[i, s]), int(batch.trash_type[i, s]))
+                  for s in range(batch.trash_count[i])],
+        'power_ups': [(int(batch.powerup_x[i, s]), float(batch.powerup_y[i, s]),
+                       PowerUp.TYPES[batch.powerup_type[i, s]])
+                      for s in range(batch.powerup_count[i])],
+    }
+
+def simulation_state(sim):
+    carrying = sim.player.carrying_trash
+    return {
+        'game_over': sim.game_state != "playing",
+        'score': sim.score,
+        'lives': sim.lives,
+        'level': sim.level,
+        'timer': sim.timer,
+        # BatchSimulation keeps per-tick countdowns; slow time starts after the
+        # countdown step of its tick, so its counter reads one higher
+        'combo': (sim.combo_count, sim.effect_ticks('combo')),
+        'effects': (sim.effect_ticks('slow_time') + sim.slow_time, sim.effect_ticks('double_points')),
+        'player_x': sim.player.x,
+        'carrying': carrying.trash_type if carrying else -1,
+        'trash': [(trash.x, trash.y, trash.trash_type) for trash in sim.trash_items],
+        'power_ups': [(powerup.x, powerup.y, powerup.type) for powerup in sim.power_ups],
+    }
+
+def check_batch_parity(games=64, ticks=3000, seed=0):
+    """Run BatchSimulation and scalar Simulations side by side; return any mismatches."""
+    seeds = [seed + i for i in range(games)]
+    batch = BatchSimulation(seeds)
+    sims = [Simulation(s) for s in seeds]
+    action_rng = random.Random(seed)
+    mismatches = []
+    for tick in range(ticks):
+        # Half the games play greedily, half mash random keys
+        actions = np.array([greedy_policy(sim) if i % 2 else action_rng.randrange(8)
+                            for i, sim in enumerate(sims)], np.int64)
+        batch.tick(actions)
+        for i, sim in enumerate(sims):
+            if sim.game_state == "playing":
+                sim.tick(int(actions[i]))
+            expected = simulation_state(sim)
+            actual = batch_state(batch, i)
+            if actual != expected:
+                diff = {key: (expected[key], actual[key]) for key in expected if expected[key] != actual[key]}
+                mismatches.append((tick, seeds[i], diff))
+        if mismatches or all(sim.game_state != "playing" for sim in sims):
+            break
+    return mismatches
+
+def benchmark_batch(sizes=(1, 16, 256, 4096), ticks=300, seed=0):
+    """Aggregate game ticks per second for BatchSimulation at several batch sizes."""
+    results = {}
+    for n in sizes:
+        batch = BatchSimulation([seed + i for i in range(n)])
+        action_rng = np.random.default_rng(seed)
+        game_ticks = 0
+        start = time.perf_counter()
+        for _ in range(ticks):
+            game_ticks += int((~batch.game_over).sum())
+            batch.tick(action_rng.integers(0, 4, n))
+        elapsed = time.perf_counter() - start
+        results[n] = game_ticks / elapsed
+    return results
+
+# Threaded simulation
+# Everything the renderer needs from one tick, as plain immutable values
+Snapshot = namedtuple('Snapshot', [
+    'tick',
+    'hud',         # Game.hud_state()
+    'player',      # (x, y, animation_frame)
+    'carrying',    # carried trash type, or -1
+    'trash',       # ((x, y, type), ...)
+    'power_ups',   # ((x, y including bounce, type), ...)
+    'glowing',     # indexes of glowing bins
+    'particles',   # ready-made (sprite, position) blit pairs
+    'input_time',  # perf_counter stamp of the newest input applied, or None
+])
+
+class SnapshotBuffer:
+    """Triple buffer handing snapshots from the simulation to the renderer.
+
+    The writer fills its back slot and swaps it with the middle one; the
+    reader swaps the middle slot to the front when a newer one is waiting.
+    The lock is held only for those index swaps, so neither side waits for
+    the other to finish building or drawing.
+    """
+    def __init__(self):
+        self.slots = [None, None, None]
+        self.back, self.middle, self.front = 0, 1, 2
+        self.fresh = False
+        self.lock = threading.Lock()
+    
+    def publish(self, snapshot):
+        self.slots[self.back] = snapshot
+        with self.lock:
+            self.back, self.middle = self.middle, self.back
+            self.fresh = True
+    
+    def latest(self):
+        with self.lock:
+            if self.fresh:
+                self.front, self.middle = self.middle, self.front
+                self.fresh = False
+        return self.slots[self.front]
+
+class SimulationThread:
+    """Ticks a Game at FPS on a worker thread and publishes a snapshot after each update.
+
+    The main thread keeps event handling and drawing, so a slow frame no
+    longer holds back the simulation. The thread ends by itself when the
+    game stops playing.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.buffer = SnapshotBuffer()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+    
+    def start(self):
+        self.buffer.publish(self.game.snapshot())
+        self.thread.start()
+    
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+    
+    def run(self):
+        game = self.game
+        stats = game.frame_stats
+        next_tick = time.perf_counter()
+        while not self.stopping.is_set() and game.game_state == "playing":
+            now = time.perf_counter()
+            if now < next_tick:
+                self.stopping.wait(next_tick - now)
+                continue
+            steps = 0
+            while now >= next_tick and steps < MAX_CATCH_UP_STEPS and game.game_state == "playing":
+                game.update_game()
+                next_tick += TICK_SECONDS
+                steps += 1
+            stats['ticks'] += steps
+            backlog = int((now - next_tick) / TICK_SECONDS)
+            if backlog > MAX_CATCH_UP_STEPS * MAX_SKIPPED_RENDERS:
+                # Too far behind to ever catch up; accept the lost time
+                stats['dropped_ticks'] += backlog
+                next_tick += backlog * TICK_SECONDS
+            self.buffer.publish(game.snapshot())
+
+# Scores
+SCORES_PATH = os.path.join(os.path.expanduser("~"), ".trash_trouble", "scores.db")
+LEADERBOARD_SIZE = 10
+
+class ScoreStore:
+    """Persistent scores in SQLite, written in batches by a background thread.
+
+    Every finished game is appended to `scores`; `bests` keeps one row per
+    player, indexed by score so the global top-K is a short index walk. The
+    frame thread only queues writes and reads the cached `top` list and
+    `bests` dict, which the writer refreshes after each batch.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scores (
+            id INTEGER PRIMARY KEY,
+            player TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            level INTEGER NOT NULL,
+            played_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS bests (
+            player TEXT PRIMARY KEY,
+            score INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS bests_by_score ON bests (score DESC);
+    """
+    BATCH_SIZE = 256
+    
+    def __init__(self, path=SCORES_PATH, top_k=LEADERBOARD_SIZE):
+        self.path = path
+        self.top_k = top_k
+        self.top = []    # [(player, best score)], highest first
+        self.bests = {}  # player -> best score, for players looked up so far
+        self.queue = queue.Queue()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.writer, name="score-writer", daemon=True)
+        self.thread.start()
+    
+    def submit(self, player, score, level):
+        # Reflected in the cache at once; the writer catches up with disk
+        if score > self.bests.get(player, -1):
+            self.bests[player] = score
+        self.queue.put(('score', (player, score, level, time.time())))
+    
+    def watch(self, player):
+        """Load a player's best into the cache in the background."""
+        self.queue.put(('best', player))
+    
+    def close(self):
+        """Flush pending writes and stop the writer."""
+        self.queue.put(None)
+        self.thread.join()
+    
+    def writer(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(self.SCHEMA)
+            self.refresh_top(db)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Score store unavailable, scores will not be saved: {e}")
+            self.ready.set()
+            while self.queue.get() is not None:
+                pass
+            return
+        self.ready.set()
+        
+        running = True
+        while running:
+            # Block for one request, then take whatever else is already queued
+            batch = [self.queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                running = False
+            
+            rows = [data for kind, data in batch if kind == 'score']
+            players = {data for kind, data in batch if kind == 'best'}
+            try:
+                if rows:
+                    with db:
+                        db.executemany("INSERT INTO scores (player, score, level, played_at) VALUES (?, ?, ?, ?)",
+                                       rows)
+                        db.executemany("INSERT INTO bests (player, score) VALUES (?, ?) "
+                                       "ON CONFLICT (player) DO UPDATE SET score = max(score, excluded.score)",
+                                       [row[:2] for row in rows])
+                    self.refresh_top(db)
+                    players.update(row[0] for row in rows)
+                for player in players:
+                    best = db.execute("SELECT score FROM bests WHERE player = ?", (player,)).fetchone()
+                    if best:
+                        self.bests[player] = max(best[0], self.bests.get(player, -1))
+            except sqlite3.Error as e:
+                print(f"Could not save scores: {e}")
+        db.close()
+    
+    def refresh_top(self, db):
+        self.top = db.execute("SELECT player, score FROM bests ORDER BY score DESC LIMIT ?",
+                              (self.top_k,)).fetchall()
+
+class Game(Simulation):
+    def __init__(self, dirty_rects=False, swarm=0, record=None, profile=None, scores=None, threaded=False,
+                 quality=None, window=None, fullscreen=False, smooth=None, render_scale=1):
+        init_display()
+        # The game draws in SCREEN_WIDTH x SCREEN_HEIGHT coordinates onto a canvas at
+        # render_scale; the presenter fits that canvas to the display
+        self.presenter = Presenter(window, fullscreen, smooth, render_scale)
+        self.screen = self.presenter.canvas
+        pygame.display.set_caption("Trash Trouble - Clean Interface")
+        self.clock = pygame.time.Clock()
+        sprite_atlas.get('robot', self.screen.scale)  # bake this scale's sprites before the first frame
+        
+        self.options = {'dirty_rects': dirty_rects, 'swarm': swarm, 'record': record, 'profile': profile,
+                        'scores': scores, 'threaded': threaded, 'quality': quality,
+                        'window': window, 'fullscreen': fullscreen, 'smooth': smooth, 'render_scale': render_scale}
+        # A fixed quality level, or None to let the governor pick one from frame times
+        self.governor = QualityGovernor() if quality is None else None
+        self.quality = QUALITY_LEVELS[quality or 0]
+        self.score_store = None  # opened by run()
+        self.frame_profiler = None
+        self.profiler = None
+        # Input is handed to update_game under a lock, as it may run on the simulation thread
+        self.input_lock = threading.Lock()
+        self.latency = {'input_to_state': deque(maxlen=4096), 'input_to_display': deque(maxlen=4096)}
+        self.sim_thread = None
+        self.render_player = Player()
+        self.preview_player = Player()
+        self.preview_player.x = SCREEN_WIDTH//2 - 30
+        self.preview_player.y = 480
+        self.recordings_saved = 0
+        self.scene = None
+        self.dirty_renderer = None
+        self.new_game()
+        if profile:
+            self.toggle_profiler()
+        self.dirty_renderer = DirtyRectRenderer(self) if dirty_rects else None
+        
+        # Game state
+        self.game_state = "enter_name"
+        self.player_name = ""
+        self.input_active = True
+        
+        # UI elements
+        self.input_box_rect = pygame.Rect(SCREEN_WIDTH//2 - 150, 200, 300, 50)
+        self.upload_button_rect = pygame.Rect(SCREEN_WIDTH//2 - 100, 280, 200, 40)
+        self.face_loading = False
+        self.reset_face_button_rect = pygame.Rect(SCREEN_WIDTH//2 - 100, 330, 200, 40)
+        
+        self.player_face_image = self.load_player_face()
+        if self.player_face_image:
+            self.player.face_image = self.player_face_image
+            
+        self.high_score = 0
+    
+    def save_state(self):
+        name = self.player_name.encode()
+        return Simulation.save_state(self) + STATE_GAME.pack(self.high_score, len(name)) + name
+    
+    def restore_state(self, data):
+        pos = Simulation.restore_state(self, data)
+        self.high_score, length = STATE_GAME.unpack_from(data, pos)
+        pos += STATE_GAME.size
+        self.player_name = bytes(data[pos:pos + length]).decode()
+        if self.dirty_renderer:
+            self.dirty_renderer.invalidate()
+        return pos + length
+    
+    def create_particles(self, x, y, color, count=5):
+        # Particles are cosmetic, so the quality level may thin them out
+        count = int(count * self.quality.particles + 0.5)
+        if count:
+            self.particles.emit(x, y, color, count)
+    
+    def glowing_bins(self):
+        if not self.quality.glow:
+            return []
+        return [bin for bin in self.bins if bin.glow]
+    
+    def govern_quality(self, work_seconds):
+        """Feed a frame's work time to the governor and apply any new quality level."""
+        if self.governor and self.governor.add(work_seconds):
+            self.quality = self.governor.quality
+            if self.dirty_renderer:
+                # Effects that are no longer drawn must be cleared too
+                self.dirty_renderer.invalidate()
+    
+    def open_file_dialog_and_load_face(self):
+        # The dialog and decoding run on a worker so the window keeps responding
+        if self.face_loading:
+            return
+        self.face_loading = True
+        threading.Thread(target=self.face_loader, name="face-loader", daemon=True).start()
+    
+    def face_loader(self, file_path=None):
+        """Worker: pick and prepare a face image, then post FACE_LOADED."""
+        file_path = file_path or choose_face_file()
+        image = error = None
+        if file_path:
+            try:
+                # Load, scale and mask the image once
+                image = prepare_face_image(file_path)
+            except Exception as e:
+                error = str(e)
+        pygame.event.post(pygame.event.Event(FACE_LOADED, path=file_path, image=image, error=error))
+    
+    def face_loaded(self, event):
+        self.face_loading = False
+        if event.image:
+            image = event.image.convert_alpha()
+            self.player_face_image = image
+            self.player.face_image = image
+            print(f"Face image loaded successfully: {event.path}")
+        elif event.error:
+            print(f"Error loading face image: {event.error}")
+
+    def load_player_face(self, file_path=None):
+        try:
+            if file_path and os.path.exists(file_path):
+                return load_face_image(file_path)
+        except Exception as e:
+            print(f"Could not load face image: {e}")
+        return None
+    
+    def reset_face(self):
+        self.player.face_image = None
+        self.player_face_image = None
+        print("Robot face reset to default")
+    
+    def read_held_keys(self):
+        keys = pygame.key.get_pressed()
+        action = ACTION_NONE
+        if keys[pygame.K_LEFT]:
+            action |= ACTION_LEFT
+        if keys[pygame.K_RIGHT]:
+            action |= ACTION_RIGHT
+        self.held_action = action
+    
+    def add_input(self, action=ACTION_NONE, stamp=None):
+        """Queue a one-off action for the next tick, stamped for latency tracking."""
+        with self.input_lock:
+            self.pending_action |= action
+            self.input_times.append(stamp or time.perf_counter())
+    
+    def update_game(self):
+        with self.input_lock:
+            action = self.pending_action | self.held_action
+            self.pending_action = ACTION_NONE
+            input_times = self.input_times
+            self.input_times = []
+        if input_times:
+            now = time.perf_counter()
+            self.latency['input_to_state'].extend(now - stamp for stamp in input_times)
+            self.last_input_time = max(input_times)
+        self.tick(action)
+        if self.game_state == "game_over":
+            self.finish_game()
+    
+    def finish_game(self):
+        if self.score > self.high_score:
+            self.high_score = self.score
+        if self.score_store:
+            self.score_store.submit(self.player_name, self.score, self.level)
+    
     def draw_background(self):
         # Clean sky blue background like reference image
-        self.screen.fill((135, 206, 235))
-        
-        # Simple white floating elements
-        for element in self.background_elements:
-            pygame.draw.circle(self.screen, (255, 255, 255, 100), 
-                             (int(element['x']), int(element['y'])), element['size'])
+        self.scene.draw_sky(self.screen)
     
     def draw_menu(self):
         self.draw_background()
         
         # Title
-        font = pygame.font.Font(None, 72)
-        title = font.render("TRASH TROUBLE", True, WHITE)
-        title_shadow = font.render("TRASH TROUBLE", True, BLACK)
-        self.screen.blit(title_shadow, (SCREEN_WIDTH//2 - title.get_width()//2 + 2, 102))
-        self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
+        self.screen.text("TRASH TROUBLE", 72, BLACK, midtop=(SCREEN_WIDTH//2 + 2, 102))
+        self.screen.text("TRASH TROUBLE", 72, WHITE, midtop=(SCREEN_WIDTH//2, 100))
         
         # Instructions
-        font = pygame.font.Font(None, 28)
         instructions = [
             "Sort falling trash into correct bins!",
             "",
@@ -601,30 +3119,45 @@ class Game:
         for i, instruction in enumerate(instructions):
             if instruction:
                 color = WHITE if not instruction.startswith("Press") else YELLOW
-                text = font.render(instruction, True, color)
-                self.screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 250 + i * 40))
+                self.screen.text(instruction, 28, color, midtop=(SCREEN_WIDTH//2, 250 + i * 40))
     
     def draw_game(self):
-        self.draw_background()
+        prof = self.profiler
+        # Sky, dots and bins come from the scene layers
+        self.scene.draw_playfield(self.screen)
+        if prof:
+            prof.lap('draw.background')
         
-        # Draw bins
-        for bin in self.bins:
+        # Only glowing bins differ from the baked ones
+        for bin in self.glowing_bins():
             bin.draw(self.screen)
+        if prof:
+            prof.lap('draw.bins')
+        
+        self.draw_entities()
+        if prof:
+            prof.lap('draw.entities')
         
+        # UI
+        self.draw_ui()
+        if prof:
+            prof.lap('draw.ui')
+    
+    def draw_entities(self):
         # Draw trash items
         for trash in self.trash_items:
             trash.draw(self.screen)
         
         # Draw power-ups
+        quality = self.quality
         for powerup in self.power_ups:
-            powerup.draw(self.screen)
+            powerup.draw(self.screen, quality.bounce)
         
         # Draw particles
-        for particle in self.particles:
-            particle.draw(self.screen)
+        self.particles.draw(self.screen)
         
         # Draw player
-        self.player.draw(self.screen)
+        self.player.draw(self.screen, quality.bob)
         
         # Draw carried trash
         if self.player.carrying_trash:
@@ -632,191 +3165,1212 @@ class Game:
             carried_trash.x = self.player.x + 15
             carried_trash.y = self.player.y - 40
             carried_trash.draw(self.screen)
+    
+    def snapshot(self):
+        player = self.player
+        carrying = player.carrying_trash
+        quality = self.quality
+        return Snapshot(
+            self.ticks,
+            self.hud_state(),
+            (player.x, player.y, player.animation_frame if quality.bob else 0),
+            carrying.trash_type if carrying else -1,
+            tuple((trash.x, trash.y, trash.trash_type) for trash in self.trash_items),
+            tuple((powerup.x, powerup.y + (int(math.sin(powerup.bounce) * 2) if quality.bounce else 0),
+                   powerup.type) for powerup in self.power_ups),
+            tuple(bin.bin_type for bin in self.glowing_bins()),
+            tuple(self.particles.blit_list(self.screen.scale)),
+            self.last_input_time,
+        )
+    
+    def draw_snapshot(self, snapshot):
+        """Draw a published Snapshot the way draw_game draws the live state."""
+        screen = self.screen
+        self.scene.draw_playfield(screen, snapshot.tick)
+        for i in snapshot.glowing:
+            bin = self.bins[i]
+            screen.blit(sprite_atlas.get(('bin', i, True), screen.scale), (bin.x - 5, bin.y - 5))
+        for x, y, trash_type in snapshot.trash:
+            screen.blit(sprite_atlas.get(('trash', trash_type), screen.scale), (x, y))
+        for x, y, powerup_type in snapshot.power_ups:
+            screen.blit(sprite_atlas.get(('powerup', powerup_type), screen.scale), (x, y))
+        screen.blits(snapshot.particles, doreturn=False)
         
-        # UI
-        self.draw_ui()
+        player = self.render_player
+        player.x, player.y, player.animation_frame = snapshot.player
+        player.face_image = self.player.face_image
+        player.draw(screen)
+        if snapshot.carrying >= 0:
+            screen.blit(sprite_atlas.get(('trash', snapshot.carrying), screen.scale), (player.x + 15, player.y - 40))
+        self.draw_ui(snapshot.hud)
+    
+    def hud_state(self):
+        """Everything draw_ui depends on; the HUD needs redrawing when this changes."""
+        return (self.score, self.score_multiplier, self.level, self.player_name,
+                int(self.timer), self.timer > 20, self.lives, self.combo_count)
+    
+    def entity_rects(self):
+        """Screen rects covered by everything that moves or animates during play."""
+        rects = self.scene.dot_rects()
+        for bin in self.glowing_bins():
+            rects.append(pygame.Rect(bin.x - 5, bin.y - 5, bin.width + 10, bin.height + 10))
+        for trash in self.trash_items:
+            rects.append(pygame.Rect(int(trash.x), int(trash.y), trash.width, trash.height))
+        for powerup in self.power_ups:
+            rects.append(pygame.Rect(powerup.x, int(powerup.y) - 2, powerup.width, powerup.height + 4))
+        particle_bounds = self.particles.bounds()
+        if particle_bounds:
+            rects.append(particle_bounds)
+        player = self.player
+        rects.append(pygame.Rect(player.x - 2, player.y - 1, player.width + 4, player.height + 2))
+        if player.carrying_trash:
+            rects.append(pygame.Rect(player.x + 15, player.y - 40, TRASH_WIDTH, TRASH_HEIGHT))
+        pad = 2 + 2 * self.screen.slack
+        return [rect.inflate(pad, pad) for rect in rects]
     
-    def draw_ui(self):
+    def draw_ui(self, hud=None):
         # Clean UI like reference image
-        font = pygame.font.Font(None, 24)
-        
+        score, score_multiplier, level, player_name, seconds, plenty_of_time, lives, combo_count = \
+            hud or self.hud_state()
         # Score
-        score_text = f"Score: {self.score}"
-        if self.score_multiplier > 1:
-            score_text += f" (×{self.score_multiplier})"
-        score_surface = font.render(score_text, True, BLACK)
-        self.screen.blit(score_surface, (10, 10))
+        score_text = f"Score: {score}"
+        if score_multiplier > 1:
+            score_text += f" (×{score_multiplier})"
+        self.screen.text(score_text, 24, BLACK, topleft=(10, 10))
         
         # Level
-        level_surface = font.render(f"Level: {self.level}", True, BLACK)
-        self.screen.blit(level_surface, (10, 35))
+        self.screen.text(f"Level: {level}", 24, BLACK, topleft=(10, 35))
         
         # Player Name
-        name_surface = font.render(f"Player: {self.player_name}", True, BLACK)
-        self.screen.blit(name_surface, (SCREEN_WIDTH // 2 - name_surface.get_width() // 2, 10))
+        self.screen.text(f"Player: {player_name}", 24, BLACK, midtop=(SCREEN_WIDTH // 2, 10))
         
         # Timer
-        timer_color = BLACK if self.timer > 20 else RED
-        timer_surface = font.render(f"Time: {int(self.timer)}", True, timer_color)
-        self.screen.blit(timer_surface, (SCREEN_WIDTH - 120, 10))
+        timer_color = BLACK if plenty_of_time else RED
+        self.screen.text(f"Time: {seconds}", 24, timer_color, topleft=(SCREEN_WIDTH - 120, 10))
         
         # Lives (hearts)
-        for i in range(self.lives):
+        for i in range(lives):
             heart_x = SCREEN_WIDTH - 120 + i * 20
-            pygame.draw.circle(self.screen, RED, (heart_x, 45), 6)
+            self.screen.circle(RED, (heart_x, 45), 6)
         
         # Combo
-        if self.combo_count > 1:
-            combo_surface = font.render(f"Combo: {self.combo_count}×", True, ORANGE)
-            self.screen.blit(combo_surface, (10, 60))
+        if combo_count > 1:
+            self.screen.text(f"Combo: {combo_count}×", 24, ORANGE, topleft=(10, 60))
     
     def draw_game_over(self):
         self.draw_background()
-        font = pygame.font.Font(None, 64)
-        over_text = font.render("GAME OVER", True, RED)
-        self.screen.blit(over_text, (SCREEN_WIDTH//2 - over_text.get_width()//2, 200))
-        
-        font_small = pygame.font.Font(None, 32)
-        score_text = font_small.render(f"{self.player_name}'s Score: {self.score}", True, BLACK)
-        self.screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 280))
+        self.screen.text("GAME OVER", 64, RED, midtop=(SCREEN_WIDTH//2, 200))
+        self.screen.text(f"{self.player_name}'s Score: {self.score}", 32, BLACK, midtop=(SCREEN_WIDTH//2, 280))
         
-        high_score_text = font_small.render(f"High Score: {self.high_score}", True, BLACK)
-        self.screen.blit(high_score_text, (SCREEN_WIDTH//2 - high_score_text.get_width()//2, 320))
+        high_score = self.high_score
+        if self.score_store:
+            high_score = max(high_score, self.score_store.bests.get(self.player_name, 0))
+        self.screen.text(f"High Score: {high_score}", 32, BLACK, midtop=(SCREEN_WIDTH//2, 320))
+        self.screen.text("Press R to Restart or Q to Quit", 32, BLACK, midtop=(SCREEN_WIDTH//2, 380))
         
-        tip_text = font_small.render("Press R to Restart or Q to Quit", True, BLACK)
-        self.screen.blit(tip_text, (SCREEN_WIDTH//2 - tip_text.get_width()//2, 380))
+        # Leaderboard from the store's cache, never read from disk here
+        if self.score_store and self.score_store.top:
+            self.screen.text("Leaderboard", 28, WHITE, midtop=(SCREEN_WIDTH//2, 430))
+            for i, (name, score) in enumerate(self.score_store.top[:5]):
+                color = DARK_GREEN if name == self.player_name else BLACK
+                y = 465 + i * 28
+                self.screen.text(f"{i + 1}. {name}", 24, color, topleft=(SCREEN_WIDTH//2 - 150, y))
+                self.screen.text(str(score), 24, color, topright=(SCREEN_WIDTH//2 + 150, y))
     
     def draw_enter_name(self):
         self.draw_background()
-        font_title = pygame.font.Font(None, 48)
-        font_input = pygame.font.Font(None, 36)
-        font_inst = pygame.font.Font(None, 24)
 
         # Title
-        title_text = font_title.render("Create Your Robot Player", True, BLACK)
-        self.screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 100))
+        self.screen.text("Create Your Robot Player", 48, BLACK, midtop=(SCREEN_WIDTH//2, 100))
         
         # Input Box
         input_color = YELLOW if self.input_active else GRAY
-        pygame.draw.rect(self.screen, WHITE, self.input_box_rect)
-        pygame.draw.rect(self.screen, input_color, self.input_box_rect, 3)
+        self.screen.rect(WHITE, self.input_box_rect)
+        self.screen.rect(input_color, self.input_box_rect, 3)
         
         # Player name text
-        name_surface = font_input.render(self.player_name, True, BLACK)
-        self.screen.blit(name_surface, (self.input_box_rect.x + 10, self.input_box_rect.y + 10))
+        self.screen.text(self.player_name, 36, BLACK, topleft=(self.input_box_rect.x + 10, self.input_box_rect.y + 10))
         
         # Upload button
-        pygame.draw.rect(self.screen, ORANGE, self.upload_button_rect)
-        upload_text = font_inst.render("Upload Face Image", True, BLACK)
-        text_rect = upload_text.get_rect(center=self.upload_button_rect.center)
-        self.screen.blit(upload_text, text_rect)
+        self.screen.rect(GRAY if self.face_loading else ORANGE, self.upload_button_rect)
+        if self.face_loading:
+            self.screen.text("Loading" + "." * self.loading_frame(), 24, WHITE, center=self.upload_button_rect.center)
+        else:
+            self.screen.text("Upload Face Image", 24, BLACK, center=self.upload_button_rect.center)
         
         # Reset button
-        pygame.draw.rect(self.screen, RED, self.reset_face_button_rect)
-        reset_text = font_inst.render("Reset to Default", True, WHITE)
-        reset_rect = reset_text.get_rect(center=self.reset_face_button_rect.center)
-        self.screen.blit(reset_text, reset_rect)
+        self.screen.rect(RED, self.reset_face_button_rect)
+        self.screen.text("Reset to Default", 24, WHITE, center=self.reset_face_button_rect.center)
         
         # Instructions
-        inst_text1 = font_inst.render("Enter your name and press ENTER to continue", True, BLACK)
-        self.screen.blit(inst_text1, (SCREEN_WIDTH//2 - inst_text1.get_width()//2, 400))
+        self.screen.text("Enter your name and press ENTER to continue", 24, BLACK, midtop=(SCREEN_WIDTH//2, 400))
         
         # Face status
-        if self.player.face_image:
-            face_text = font_inst.render("✓ Custom face loaded!", True, GREEN)
-            self.screen.blit(face_text, (SCREEN_WIDTH//2 - face_text.get_width()//2, 430))
+        if self.face_loading:
+            self.screen.text("Loading face image...", 24, ORANGE, midtop=(SCREEN_WIDTH//2, 430))
+        elif self.player.face_image:
+            self.screen.text("✓ Custom face loaded!", 24, GREEN, midtop=(SCREEN_WIDTH//2, 430))
         else:
-            face_text = font_inst.render("Using default robot face", True, GRAY)
-            self.screen.blit(face_text, (SCREEN_WIDTH//2 - face_text.get_width()//2, 430))
+            self.screen.text("Using default robot face", 24, GRAY, midtop=(SCREEN_WIDTH//2, 430))
         
         # Robot preview
-        preview_player = Player()
-        preview_player.x = SCREEN_WIDTH//2 - 30
-        preview_player.y = 480
-        preview_player.face_image = self.player.face_image
-        preview_player.draw(self.screen)
+        self.preview_player.face_image = self.player.face_image
+        self.preview_player.draw(self.screen)
+
+    def loading_frame(self):
+        return pygame.time.get_ticks() // LOADING_FRAME_MS % 4
+    
+    def idle_view(self):
+        """Everything the current idle screen shows; it needs redrawing when this changes."""
+        if self.game_state == "enter_name":
+            return (self.game_state, self.player_name, self.input_active, self.player.face_image,
+                    self.face_loading, self.loading_frame() if self.face_loading else None)
+        if self.game_state == "game_over":
+            store = self.score_store
+            return (self.game_state, self.player_name, self.score, self.high_score,
+                    store and store.bests.get(self.player_name), store and tuple(store.top[:5]))
+        return (self.game_state,)
+    
+    def idle_timeout(self):
+        """Milliseconds until the idle screen may change without input."""
+        if self.game_state == "enter_name" and self.face_loading:
+            return LOADING_FRAME_MS - pygame.time.get_ticks() % LOADING_FRAME_MS
+        return IDLE_POLL_MS
+    
+    def wait_for_events(self, timeout):
+        """Block until an event arrives or timeout ms pass; returns the events taken."""
+        event = pygame.event.wait(timeout)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event]
+    
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == FACE_LOADED:
+            self.face_loaded(event)
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            self.shown_view = None
+        elif event.type == pygame.VIDEORESIZE:
+            self.presenter.layout()
+            self.shown_view = None
+            if self.dirty_renderer:
+                self.dirty_renderer.invalidate()
+        
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F3:
+                self.toggle_profiler()
+            elif event.key == pygame.K_F4:
+                self.export_profile()
+        
+        self.EVENT_HANDLERS[self.game_state](self, event)
+    
+    def handle_enter_name_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            pos = self.presenter.to_logical(event.pos)
+            if self.upload_button_rect.collidepoint(pos):
+                self.open_file_dialog_and_load_face()
+            elif self.reset_face_button_rect.collidepoint(pos):
+                self.reset_face()
+            elif self.input_box_rect.collidepoint(pos):
+                self.input_active = True
+            else:
+                self.input_active = False
 
+        if event.type == pygame.KEYDOWN:
+            if self.input_active:
+                if event.key == pygame.K_RETURN:
+                    if self.player_name.strip():
+                        self.game_state = "menu"
+                        if self.score_store:
+                            self.score_store.watch(self.player_name)
+                elif event.key == pygame.K_BACKSPACE:
+                    self.player_name = self.player_name[:-1]
+                else:
+                    if len(self.player_name) < 15:
+                        self.player_name += event.unicode
+    
+    def handle_menu_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+            self.game_state = "playing"
+    
+    def handle_playing_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            self.handle_play_key(event)
+    
+    def handle_game_over_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r:
+                self.restart_game()
+            elif event.key == pygame.K_q:
+                self.running = False
+    
+    EVENT_HANDLERS = {
+        'enter_name': handle_enter_name_event,
+        'menu': handle_menu_event,
+        'playing': handle_playing_event,
+        'game_over': handle_game_over_event,
+    }
+    
+    def new_game(self):
+        """Reset the rules state for a new game, keeping the window and everything else."""
+        profiler = self.profiler
+        # Every game gets a fresh seed so a recording can reproduce it exactly
+        Simulation.__init__(self, seed=random.getrandbits(63), swarm=self.options['swarm'])
+        self.profiler = profiler
+        if self.options['record']:
+            self.recorder = InputRecorder(self.seed, self.options['swarm'])
+        self.pending_action = ACTION_NONE
+        self.held_action = ACTION_NONE
+        self.input_times = []
+        self.last_input_time = None
+        self.shown_input_time = None
+        if self.scene is None:
+            self.scene = SceneCompositor(self, self.effects_rng)
+        else:
+            self.scene.invalidate()  # the cached playfield shows the old bins
+        if self.dirty_renderer:
+            self.dirty_renderer.invalidate()
+    
     def restart_game(self):
-        if self.score > self.high_score:
-            self.high_score = self.score
+        if self.sim_thread:
+            self.sim_thread.stop()
+            self.sim_thread = None
+        self.save_recording()
         
-        # Keep important data
         face_image = self.player.face_image
-        player_name = self.player_name
-        high_score = self.high_score
-        
-        self.__init__()
-        self.player_name = player_name
+        self.new_game()
         self.player.face_image = face_image
-        self.high_score = high_score
         self.game_state = "playing"
     
-    def run(self):
-        running = True
-        
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                
-                if self.game_state == "enter_name":
-                    if event.type == pygame.MOUSEBUTTONDOWN:
-                        if self.upload_button_rect.collidepoint(event.pos):
-                            self.open_file_dialog_and_load_face()
-                        elif self.reset_face_button_rect.collidepoint(event.pos):
-                            self.reset_face()
-                        elif self.input_box_rect.collidepoint(event.pos):
-                            self.input_active = True
-                        else:
-                            self.input_active = False
-
-                    if event.type == pygame.KEYDOWN:
-                        if self.input_active:
-                            if event.key == pygame.K_RETURN:
-                                if self.player_name.strip():
-                                    self.game_state = "menu"
-                            elif event.key == pygame.K_BACKSPACE:
-                                self.player_name = self.player_name[:-1]
-                            else:
-                                if len(self.player_name) < 15:
-                                    self.player_name += event.unicode
-                
-                elif event.type == pygame.KEYDOWN:
-                    if self.game_state == "menu":
-                        if event.key == pygame.K_SPACE:
-                            self.game_state = "playing"
-                    
-                    elif self.game_state == "playing":
-                        if event.key == pygame.K_SPACE:
-                            self.handle_drop()
-                    
-                    elif self.game_state == "game_over":
-                        if event.key == pygame.K_r:
-                            self.restart_game()
-                        elif event.key == pygame.K_q:
-                            running = False
-            
-            # Update
-            if self.game_state == "playing":
-                self.update_game()
-            
-            # Draw
+    def save_recording(self):
+        """Write this game's input log, if recording and the game was played."""
+        if not self.recorder or not self.ticks:
+            return
+        self.recordings_saved += 1
+        path = self.options['record']
+        if self.recordings_saved > 1:
+            root, ext = os.path.splitext(path)
+            path = f"{root}-{self.recordings_saved}{ext}"
+        try:
+            self.recorder.save(path, self)
+            print(f"Replay saved: {path}")
+        except OSError as e:
+            print(f"Could not save replay: {e}")
+    
+    def interpolate(self, alpha):
+        """Move entities alpha of the way from their previous to current tick.
+
+        Returns the saved positions for restore_positions().
+        """
+        saved = []
+        for entity in [self.player, *self.trash_items, *self.power_ups]:
+            saved.append((entity, entity.x, entity.y))
+            entity.x = entity.prev_x + (entity.x - entity.prev_x) * alpha
+            entity.y = entity.prev_y + (entity.y - entity.prev_y) * alpha
+        self.player.x = int(round(self.player.x))
+        return saved
+    
+    def restore_positions(self, saved):
+        for entity, x, y in saved:
+            entity.x = x
+            entity.y = y
+    
+    def draw_frame(self, alpha=1.0):
+        prof = self.profiler
+        if prof:
+            prof.start()
+        dirty = None
+        if self.sim_thread and self.game_state == "playing":
+            snapshot = self.sim_thread.buffer.latest()
+            self.draw_snapshot(snapshot)
+            input_time = snapshot.input_time
+            if prof:
+                prof.lap('draw.snapshot')
+        elif self.game_state == "playing":
+            input_time = self.last_input_time
+            saved = self.interpolate(alpha)
+            if self.dirty_renderer:
+                if prof:
+                    # The overlay is not tracked by the dirty renderer
+                    self.dirty_renderer.invalidate()
+                dirty = self.dirty_renderer.draw()
+                if prof:
+                    prof.lap('draw.dirty')
+            else:
+                self.draw_game()
+            self.restore_positions(saved)
+        else:
+            input_time = None
+            if self.dirty_renderer:
+                self.dirty_renderer.invalidate()
             if self.game_state == "enter_name":
                 self.draw_enter_name()
             elif self.game_state == "menu":
                 self.draw_menu()
-            elif self.game_state == "playing":
-                self.draw_game()
             elif self.game_state == "game_over":
                 self.draw_game_over()
-            
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            if prof:
+                prof.lap('draw.' + self.game_state)
         
+        if prof:
+            prof.draw_overlay(self.screen, (("trash", len(self.trash_items)),
+                                            ("power-ups", len(self.power_ups)),
+                                            ("particles", len(self.particles)),
+                                            ("quality", QUALITY_LEVELS.index(self.quality))))
+            prof.lap('overlay')
+        self.presenter.present(dirty)
+        if prof:
+            prof.lap('flip')
+        if input_time is not None and input_time != self.shown_input_time:
+            self.shown_input_time = input_time
+            self.latency['input_to_display'].append(time.perf_counter() - input_time)
+    
+    def toggle_profiler(self):
+        """Switch frame profiling and its overlay on or off, keeping samples for export."""
+        if self.profiler:
+            self.profiler = None
+        else:
+            if self.frame_profiler is None:
+                self.frame_profiler = FrameProfiler()
+            self.profiler = self.frame_profiler
+    
+    def export_profile(self):
+        if self.frame_profiler is None:
+            return
+        print(f"Frame phases over the last {self.frame_profiler.window} frames (ms):")
+        for phase, stats in self.frame_profiler.summary().items():
+            print(f"  {phase:<16} " + "  ".join(f"{name} {value:.2f}" for name, value in stats.items()))
+        path = self.options['profile'] or "profile.csv"
+        try:
+            self.frame_profiler.export(path)
+            print(f"Profile samples saved: {path}")
+        except OSError as e:
+            print(f"Could not save profile: {e}")
+    
+    def report_frame_stats(self):
+        stats = self.frame_stats
+        print(f"Frames: {stats['frames']}, ticks: {stats['ticks']}, "
+              f"late frames: {stats['late_frames']}, skipped renders: {stats['skipped_renders']}, "
+              f"dropped ticks: {stats['dropped_ticks']}, idle waits: {stats['idle_waits']}")
+        if self.governor:
+            print(f"Quality level: {self.governor.level} after {self.governor.changes} changes")
+    
+    def handle_play_key(self, event):
+        """Queue the input for a key pressed during play; returns False for other keys."""
+        # Synthetic events may carry the time they were posted
+        stamp = getattr(event, 'posted', None)
+        if event.key == pygame.K_SPACE:
+            # Dropped on the next tick so the drop is part of the recorded input
+            self.add_input(ACTION_DROP, stamp)
+        elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+            self.add_input(stamp=stamp)
+        else:
+            return False
+        return True
+    
+    def forward_input(self, deadline):
+        """Pass key presses to the simulation thread as they arrive, until deadline.
+
+        Used instead of clock.tick() while the simulation has its own thread,
+        so a key press waits about a millisecond instead of up to a frame.
+        Other events are left for the main loop.
+        """
+        others = []
+        while True:
+            for event in pygame.event.get(pygame.KEYDOWN):
+                if not self.handle_play_key(event):
+                    others.append(event)
+            self.read_held_keys()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.001))
+        for event in others:
+            pygame.event.post(event)
+    
+    def report_latency(self):
+        mode = "threaded" if self.options['threaded'] else "single-threaded"
+        for name, samples in self.latency.items():
+            if samples:
+                p50, p95, p99 = (value * 1000 for value in percentiles(samples))
+                print(f"{name.replace('_', ' ')} ({mode}): p50 {p50:.1f} ms, p95 {p95:.1f} ms, "
+                      f"p99 {p99:.1f} ms over {len(samples)} inputs")
+    
+    def run(self):
+        if self.options['scores'] and not self.score_store:
+            self.score_store = ScoreStore(self.options['scores'])
+        self.main_loop()
+        self.report_frame_stats()
+        self.report_latency()
+        self.save_recording()
+        if self.options['profile']:
+            self.export_profile()
+        if self.score_store:
+            self.score_store.close()
         pygame.quit()
         sys.exit()
+    
+    def main_loop(self):
+        """Handle events, update and draw until the window is closed or the player quits."""
+        self.running = True
+        self.frame_stats = {'frames': 0, 'ticks': 0, 'late_frames': 0,
+                            'skipped_renders': 0, 'dropped_ticks': 0, 'idle_waits': 0}
+        accumulator = 0.0
+        skipped_renders = 0
+        last_time = time.perf_counter()
+        waited = []  # events taken by an idle wait, handled first
+        self.shown_view = None
+        
+        while self.running:
+            now = time.perf_counter()
+            frame_time = now - last_time
+            last_time = now
+            
+            prof = self.profiler
+            if prof:
+                prof.start()
+            events = waited + pygame.event.get()
+            waited = []
+            for event in events:
+                self.handle_event(event)
+            if self.game_state == "playing":
+                self.read_held_keys()
+            if prof:
+                prof.lap('events')
+            
+            # Update in fixed ticks, catching up on real time that has passed
+            render = True
+            if self.game_state == "playing" and self.options['threaded']:
+                # The simulation thread keeps its own time; this thread only draws
+                if not self.sim_thread:
+                    self.sim_thread = SimulationThread(self)
+                    self.sim_thread.start()
+            elif self.game_state == "playing":
+                accumulator += frame_time
+                steps = 0
+                while (accumulator >= TICK_SECONDS and steps < MAX_CATCH_UP_STEPS
+                       and self.game_state == "playing"):
+                    self.update_game()
+                    accumulator -= TICK_SECONDS
+                    steps += 1
+                self.frame_stats['ticks'] += steps
+                
+                if accumulator >= TICK_SECONDS and self.game_state == "playing":
+                    if skipped_renders < MAX_SKIPPED_RENDERS:
+                        # Still behind: spend the next frame simulating instead of drawing
+                        skipped_renders += 1
+                        render = False
+                    else:
+                        dropped = int(accumulator / TICK_SECONDS)
+                        self.frame_stats['dropped_ticks'] += dropped
+                        accumulator -= dropped * TICK_SECONDS
+                        skipped_renders = 0
+                else:
+                    skipped_renders = 0
+            else:
+                accumulator = 0.0
+            
+            # Idle screens only redraw when what they show has changed
+            idle = self.game_state in IDLE_STATES and not prof
+            if idle:
+                view = self.idle_view()
+                render = view != self.shown_view
+                self.shown_view = view
+            else:
+                self.shown_view = None
+                if frame_time > LATE_FRAME_SECONDS:
+                    self.frame_stats['late_frames'] += 1
+            
+            # Draw
+            if render:
+                self.draw_frame(min(accumulator / TICK_SECONDS, 1.0))
+                self.frame_stats['frames'] += 1
+            elif not idle:
+                self.frame_stats['skipped_renders'] += 1
+            if prof:
+                prof.end_frame()
+            if self.game_state == "playing":
+                self.govern_quality(time.perf_counter() - now)
+            if self.sim_thread and self.game_state == "playing":
+                self.forward_input(now + TICK_SECONDS)
+            elif idle and self.running:
+                if render:
+                    self.clock.tick(FPS)  # input still redraws at most FPS times a second
+                waited = self.wait_for_events(self.idle_timeout())
+                self.frame_stats['idle_waits'] += 1
+                last_time = time.perf_counter()
+            else:
+                self.clock.tick(FPS)
+        
+        if self.sim_thread:
+            self.sim_thread.stop()
+
+def measure_latency(seconds=5.0, draw_delay=0.0, seed=0):
+    """Play with synthetic key presses in both loop modes and compare input latency.
+
+    A helper thread posts arrow and space key presses stamped with their post
+    time. draw_delay (seconds) is added to every frame to show how each mode
+    copes with expensive drawing.
+    """
+    results = {}
+    for threaded in (False, True):
+        random.seed(seed)
+        game = Game(threaded=threaded)
+        game.player_name = "Latency"
+        game.game_state = "playing"
+        if draw_delay:
+            def slow_draw(alpha=1.0, draw_frame=game.draw_frame):
+                time.sleep(draw_delay)
+                draw_frame(alpha)
+            game.draw_frame = slow_draw
+        
+        stop = threading.Event()
+        def press_keys():
+            rng = random.Random(seed)
+            while not stop.wait(rng.uniform(0.03, 0.12)):
+                key = rng.choice((pygame.K_SPACE, pygame.K_LEFT, pygame.K_RIGHT))
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, posted=time.perf_counter()))
+        presser = threading.Thread(target=press_keys, daemon=True)
+        presser.start()
+        pygame.time.set_timer(pygame.QUIT, int(seconds * 1000), 1)
+        game.main_loop()
+        stop.set()
+        presser.join()
+        pygame.event.clear()
+        
+        results['threaded' if threaded else 'single-threaded'] = {
+            'ticks': game.ticks,
+            'frames': game.frame_stats['frames'],
+            **{name: tuple(value * 1000 for value in percentiles(samples)) if samples else None
+               for name, samples in game.latency.items()},
+        }
+    return results
+
+def benchmark_present(configs=((1, (900, 700)), (0.5, (900, 700)), (1, (1800, 1400)), (0.5, (1800, 1400)),
+                                (1, (1920, 1080)), (0.5, (1920, 1080))), frames=200, seed=0):
+    """Per-frame draw_game and present times in ms, per (render scale, window size)."""
+    results = {}
+    for render_scale, window in configs:
+        random.seed(seed)
+        game = Game(window=window, render_scale=render_scale, quality=0)
+        game.game_state = "playing"
+        game.step(600, greedy_policy)
+        draw = present = 0
+        for _ in range(frames):
+            start = time.perf_counter()
+            game.draw_game()
+            drawn = time.perf_counter()
+            game.presenter.present()
+            present += time.perf_counter() - drawn
+            draw += drawn - start
+        results[(render_scale, window)] = (draw / frames * 1000, present / frames * 1000)
+    return results
+
+def benchmark_drawing(frames=2000, seed=0):
+    """Compare draw_game frame time with and without the sprite atlas."""
+    game = Game()
+    game.game_state = "playing"
+    game.rng.seed(seed)
+    game.step(600, greedy_policy)
+    results = {}
+    for mode in ('immediate', 'atlas'):
+        sprite_atlas.enabled = mode == 'atlas'
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.draw_game()
+        results[mode] = (time.perf_counter() - start) / frames * 1000
+    sprite_atlas.enabled = True
+    return results
+
+# Benchmark suite
+SUITE_FRAMES = 600
+SUITE_TOLERANCE = 10.0  # percent
+SUITE_BLOCK_SLACK = 1.0  # kept blocks per frame allowed over the baseline on top of the tolerance
+
+def playing_game(**options):
+    game = Game(**options)
+    game.game_state = "playing"
+    return game
+
+def suite_max_trash(game, frame):
+    while len(game.trash_items) < game.max_trash:
+        game.spawn_trash()
+    return ACTION_NONE
+
+def suite_particle_bursts(game, frame):
+    colors = (GREEN, BLUE, RED, YELLOW, PURPLE)
+    for burst in range(10):
+        game.create_particles(game.rng.randint(0, SCREEN_WIDTH), game.rng.randint(0, SCREEN_HEIGHT),
+                              colors[burst % len(colors)], 20)
+    return greedy_policy(game)
+
+def suite_powerup_spam(game, frame):
+    game.max_power_ups = 50
+    game.spawn_powerup()
+    return greedy_policy(game)
+
+def suite_restart_cycles(game, frame):
+    if frame % 60 == 59:
+        game.game_state = "game_over"
+        game.restart_game()
+        game.game_state = "playing"
+    return greedy_policy(game)
+
+def face_game():
+    game = Game()
+    game.player_name = "Benchmark"
+    with tempfile.TemporaryDirectory() as tmp:
+        image = pygame.Surface((256, 256))
+        for y in range(256):
+            pygame.draw.line(image, (y, 128, 255 - y), (0, y), (255, y))
+        path = os.path.join(tmp, "face.png")
+        pygame.image.save(image, path)
+        game.player.face_image = load_face_image(path, cache_dir=tmp)
+    return game
+
+def suite_enter_name_face(game, frame):
+    return None  # draw only
+
+# Scenario name -> (setup returning a Game, per-frame step returning an action or None)
+SUITE_SCENARIOS = {
+    'max_trash': (lambda: playing_game(swarm=500), suite_max_trash),
+    'particle_bursts': (playing_game, suite_particle_bursts),
+    'powerup_spam': (playing_game, suite_powerup_spam),
+    'restart_cycles': (playing_game, suite_restart_cycles),
+    'enter_name_face': (face_game, suite_enter_name_face),
+}
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def run_suite_scenario(task):
+    """Drive one scenario through tick() and draw_frame() like Game.run does."""
+    name, frames, seed = task
+    setup, step = SUITE_SCENARIOS[name]
+    random.seed(seed)  # Game seeds itself from the global generator
+    game = setup()
+    
+    def play(first, count):
+        for frame in range(first, first + count):
+            action = step(game, frame)
+            if action is not None:
+                game.tick(action)
+            game.draw_frame()
+    
+    text_cache.hits = text_cache.misses = 0
+    start = time.perf_counter()
+    play(0, frames)
+    elapsed = time.perf_counter() - start
+    text_hit_rate = text_cache.hit_rate()
+    # The same number of frames again under tracemalloc, which would skew the
+    # timing: memory blocks they allocated that are still alive afterwards.
+    # Grouped by line, so frees elsewhere cannot cancel out a growing site.
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    play(frames, frames)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    kept = sum(stat.count_diff for stat in after.compare_to(before, 'lineno') if stat.count_diff > 0)
+    return {
+        'scenario': name,
+        'frames': frames,
+        'fps': frames / elapsed,
+        'kept_blocks_per_frame': kept / frames,
+        'text_cache_hit_rate': text_hit_rate,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+def run_benchmark_suite(scenarios=None, frames=SUITE_FRAMES, seed=0):
+    """Run each scenario headless in a fresh process so peak RSS is its own."""
+    # Workers inherit the environment, so they open dummy SDL devices
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    tasks = [(name, frames, seed) for name in scenarios or SUITE_SCENARIOS]
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        results = {result['scenario']: result for result in pool.imap(run_suite_scenario, tasks)}
+        pool.close()
+        pool.join()
+    return results
+
+def compare_with_baseline(results, baseline, tolerance=SUITE_TOLERANCE):
+    """Return a list of regressions: fps drops, or kept blocks or peak RSS growth, beyond tolerance percent."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['fps'] < base['fps'] * (1 - tolerance / 100):
+            regressions.append(f"{name}: {result['fps']:.1f} fps, baseline {base['fps']:.1f}")
+        kept, base_kept = result['kept_blocks_per_frame'], base.get('kept_blocks_per_frame')
+        if base_kept is not None and kept > base_kept * (1 + tolerance / 100) + SUITE_BLOCK_SLACK:
+            regressions.append(f"{name}: {kept:.2f} kept blocks/frame, baseline {base_kept:.2f}")
+        if result['peak_rss_kb'] and base.get('peak_rss_kb') and \
+                result['peak_rss_kb'] > base['peak_rss_kb'] * (1 + tolerance / 100):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_kb']} KB, baseline {base['peak_rss_kb']} KB")
+    return regressions
+
+# Soak testing
+SOAK_METRICS = ('rss_kb', 'traced_kb', 'surfaces', 'objects', 'frame_ms')
+SOAK_COLUMNS = ('session', 'seconds') + SOAK_METRICS
+
+class Autopilot:
+    """Scripted input for unattended sessions: name entry, menu, play, game over, restart.
+
+    Play follows greedy_policy for session_ticks, then the robot stands still
+    until it runs out of lives. Key presses are posted as pygame events so
+    they go through Game.handle_event like real ones; walking is returned as
+    the held action, since the dummy video driver has no keyboard state.
+    """
+    def __init__(self, session_ticks=FPS * 10, name="Autopilot", game_over_frames=FPS // 2):
+        self.session_ticks = session_ticks
+        self.name = name
+        self.game_over_frames = game_over_frames
+        self.game_over_shown = 0
+    
+    def press(self, key, unicode=""):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=0, scancode=0))
+    
+    def step(self, game):
+        """Post this frame's key presses and return the held action."""
+        state = game.game_state
+        if state == "enter_name":
+            if not game.player_name:
+                for char in self.name:
+                    self.press(ord(char.lower()), char)
+                self.press(pygame.K_RETURN)
+        elif state == "menu":
+            self.press(pygame.K_SPACE)
+        elif state == "playing":
+            if game.ticks >= self.session_ticks:
+                return ACTION_NONE
+            action = greedy_policy(game)
+            if action & ACTION_DROP:
+                self.press(pygame.K_SPACE)
+            return action & (ACTION_LEFT | ACTION_RIGHT)
+        elif state == "game_over":
+            self.game_over_shown += 1
+            if self.game_over_shown >= self.game_over_frames:
+                self.game_over_shown = 0
+                self.press(pygame.K_r)
+        return ACTION_NONE
+
+def current_rss_kb():
+    """Resident set size now, where /proc has it, else the peak so far."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_kb()
+
+def count_surfaces():
+    """Distinct pygame surfaces referenced from gc-tracked objects.
+
+    Surfaces are not tracked by the gc themselves, so they are found through
+    the lists, dicts and instances that hold them.
+    """
+    found = set()
+    for obj in gc.get_objects():
+        for referent in gc.get_referents(obj):
+            if isinstance(referent, pygame.Surface):
+                found.add(id(referent))
+    return len(found)
+
+def growing_metrics(samples, tolerance=SUITE_TOLERANCE):
+    """Metrics that never fell from one sample to the next and are still climbing.
+
+    A metric is flagged when it grew over tolerance percent in total and
+    over half that in the second half of the run, so caches that fill up
+    early and then level off are not reported. Returns {metric: (first, last)}.
+    At least three samples are needed to call a trend.
+    """
+    growing = {}
+    if len(samples) < 3:
+        return growing
+    for metric in SOAK_METRICS:
+        values = [sample[metric] for sample in samples]
+        middle = values[len(values) // 2]
+        rising = all(later >= earlier for earlier, later in zip(values, values[1:]))
+        if (rising and values[-1] > values[0] * (1 + tolerance / 100)
+                and values[-1] > middle * (1 + tolerance / 200)):
+            growing[metric] = (values[0], values[-1])
+    return growing
+
+def run_soak(sessions=1000, session_seconds=10, sample_every=None, seed=0, tolerance=SUITE_TOLERANCE):
+    """Play many autopilot sessions in one Game and watch for resources that keep growing.
+
+    Frames run back to back through the same event handling, update and
+    draw path as Game.main_loop, with a temporary score database. Every
+    sample_every sessions it records RSS, tracemalloc's traced memory, live
+    surfaces, gc objects and the mean frame time since the last sample.
+    Samples go into an array allocated up front, so taking them does not
+    show up as growth in the traced memory.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    sample_every = sample_every or max(1, sessions // 20)
+    random.seed(seed)
+    game = Game()
+    game.running = True
+    autopilot = Autopilot(session_seconds * FPS)
+    table = array('d', bytes(8 * len(SOAK_COLUMNS) * (sessions // sample_every)))
+    rows = 0
+    baseline = None
+    played = frames = 0
+    frame_ns = frames_since_sample = 0
+    start = time.perf_counter()
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        game.score_store = ScoreStore(os.path.join(tmp, "scores.db"))
+        try:
+            while played < sessions:
+                frame_start = time.perf_counter_ns()
+                held = autopilot.step(game)
+                for event in pygame.event.get():
+                    game.handle_event(event)
+                was_playing = game.game_state == "playing"
+                if was_playing:
+                    game.held_action = held
+                    game.update_game()
+                game.draw_frame()
+                frame_ns += time.perf_counter_ns() - frame_start
+                frames += 1
+                frames_since_sample += 1
+                
+                if not (was_playing and game.game_state == "game_over"):
+                    continue
+                played += 1
+                if played % sample_every:
+                    continue
+                gc.collect()
+                table[rows * len(SOAK_COLUMNS):(rows + 1) * len(SOAK_COLUMNS)] = array('d', (
+                    played,
+                    time.perf_counter() - start,
+                    current_rss_kb(),
+                    tracemalloc.get_traced_memory()[0] / 1024,
+                    count_surfaces(),
+                    len(gc.get_objects()),
+                    frame_ns / frames_since_sample / 1e6,
+                ))
+                rows += 1
+                frame_ns = frames_since_sample = 0
+                if baseline is None:
+                    baseline = tracemalloc.take_snapshot()
+            top = []
+            if baseline is not None:
+                growth = tracemalloc.take_snapshot().compare_to(baseline, 'lineno')
+                top = [(str(stat.traceback), stat.size_diff) for stat in growth[:10] if stat.size_diff > 0]
+        finally:
+            tracemalloc.stop()
+            game.score_store.close()
+    width = len(SOAK_COLUMNS)
+    samples = [dict(zip(SOAK_COLUMNS, table[row * width:(row + 1) * width])) for row in range(rows)]
+    return {
+        'sessions': played,
+        'frames': frames,
+        'seconds': time.perf_counter() - start,
+        'samples': samples,
+        'growing': growing_metrics(samples, tolerance),
+        'top_allocators': top,
+    }
+
+# Startup measurement
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, %r)
+import trash_trouble, pygame
+imported = time.perf_counter()
+side_effects = {
+    'display_initialised': pygame.display.get_init(),
+    'mixer_initialised': bool(pygame.mixer.get_init()),
+    'tkinter_imported': 'tkinter' in sys.modules,
+}
+game = trash_trouble.Game()
+created = time.perf_counter()
+game.draw_frame()
+drawn = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'game_init_ms': (created - imported) * 1000,
+    'first_frame_ms': (drawn - created) * 1000,
+    'time_to_first_frame_ms': (drawn - start) * 1000,
+    'side_effects': side_effects,
+}))
+"""
+
+def measure_startup(runs=5):
+    """Time import, Game() and the first frame in fresh interpreters; medians over runs."""
+    probe = STARTUP_PROBE % os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_ms'] = (time.perf_counter() - start) * 1000
+        samples.append(sample)
+    result = {key: sorted(sample[key] for sample in samples)[runs // 2]
+              for key in samples[0] if key != 'side_effects'}
+    result['side_effects'] = samples[0]['side_effects']
+    return result
+
+def window_size(value):
+    """argparse type for --window: WxH with both sides at least one pixel."""
+    try:
+        width, height = (int(n) for n in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WxH, got {value!r}")
+    if width < 1 or height < 1:
+        raise argparse.ArgumentTypeError(f"window sides must be positive, got {value!r}")
+    return (width, height)
+
+def render_scale(value):
+    """argparse type for --render-scale: a positive factor in whole percentages."""
+    try:
+        factor = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, got {value!r}")
+    percent = factor * 100
+    if not (1 <= percent < math.inf) or abs(percent - round(percent)) > 1e-6:
+        raise argparse.ArgumentTypeError(f"render scale must be a whole percentage of at least 0.01, got {value!r}")
+    return factor
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Trash Trouble")
+    parser.add_argument("--bench-sim", type=int, metavar="TICKS",
+                        help="run the headless simulation for TICKS ticks and report ticks/second")
+    parser.add_argument("--bench-draw", type=int, metavar="FRAMES",
+                        help="compare immediate-mode and sprite atlas frame time over FRAMES frames")
+    parser.add_argument("--bench-particles", type=int, metavar="COUNT",
+                        help="compare list and NumPy particle engines with about COUNT live particles")
+    parser.add_argument("--bench-collisions", action="store_true",
+                        help="time the trash update and collision pass for 10 to 10,000 entities")
+    parser.add_argument("--bench-batch", action="store_true",
+                        help="report aggregate ticks/second of the batch simulator for N = 1 to 4096 games")
+    parser.add_argument("--bench-snapshots", action="store_true",
+                        help="time save_state/restore_state per tick against deepcopy and check rollback")
+    parser.add_argument("--check-batch-parity", action="store_true",
+                        help="check the batch simulator against the scalar rules")
+    parser.add_argument("--swarm", type=int, default=0, metavar="N",
+                        help="swarm mode: allow up to N falling trash items")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="redraw and update only changed screen regions during play")
+    parser.add_argument("--window", type=window_size,
+                        metavar="WxH", help="window size (default %dx%d); the frame is scaled to fit"
+                        % (SCREEN_WIDTH, SCREEN_HEIGHT))
+    parser.add_argument("--render-scale", type=render_scale, default=1, metavar="FACTOR",
+                        help="draw at FACTOR times %dx%d, e.g. 0.5 on slow devices; whole percentages only"
+                        % (SCREEN_WIDTH, SCREEN_HEIGHT))
+    parser.add_argument("--fullscreen", action="store_true", help="fill the screen, keeping the aspect ratio")
+    parser.add_argument("--smooth", action=argparse.BooleanOptionalAction,
+                        help="force smooth (or nearest-neighbour) scaling; by default only shrinking is smoothed")
+    parser.add_argument("--bench-present", action="store_true",
+                        help="time drawing and presenting a frame at several render scales and window sizes")
+    parser.add_argument("--quality", type=int, choices=range(len(QUALITY_LEVELS)), metavar="LEVEL",
+                        help="fix effect quality at LEVEL (0 = full to %d = minimal) instead of adapting to frame time"
+                        % (len(QUALITY_LEVELS) - 1))
+    parser.add_argument("--threaded", action="store_true",
+                        help="run the simulation on its own thread and draw its latest snapshot")
+    parser.add_argument("--measure-latency", type=float, metavar="SECONDS",
+                        help="compare input latency of the single-threaded and threaded loops")
+    parser.add_argument("--draw-delay", type=float, default=0.0, metavar="MS",
+                        help="with --measure-latency, make every frame MS milliseconds slower")
+    parser.add_argument("--tournament", type=int, metavar="GAMES",
+                        help="play GAMES seeded headless games per policy across a process pool")
+    parser.add_argument("--policy", default="greedy",
+                        help="comma-separated bot policies (%s, or module:callable)" % ", ".join(POLICIES))
+    parser.add_argument("--processes", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--json", action="store_true", help="print tournament summaries as JSON")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record each game's input to FILE (later games get -2, -3, ... suffixes)")
+    parser.add_argument("--replay", metavar="FILE", help="re-simulate a recorded game headless and verify it")
+    parser.add_argument("--seek", type=int, metavar="TICK", help="with --replay, show the state at TICK")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="start with the frame profiler on; on exit print phase percentiles and save samples to FILE (.csv or .json)")
+    parser.add_argument("--bench-suite", nargs="*", metavar="SCENARIO",
+                        help="run headless stress scenarios (default: all of %s)" % ", ".join(SUITE_SCENARIOS))
+    parser.add_argument("--frames", type=int, default=SUITE_FRAMES, help="frames per benchmark suite scenario")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="with --bench-suite, fail on regressions against this JSON baseline")
+    parser.add_argument("--save-baseline", metavar="FILE", help="with --bench-suite, write results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=SUITE_TOLERANCE,
+                        help="allowed fps drop / kept blocks or peak RSS growth in percent, or growth before --soak "
+                        "flags a metric (default %(default)s)")
+    parser.add_argument("--soak", type=int, metavar="SESSIONS",
+                        help="play SESSIONS autopilot games headless and report resources that keep growing")
+    parser.add_argument("--session-seconds", type=int, default=10, metavar="SECONDS",
+                        help="with --soak, seconds of active play per session before the autopilot lets it end")
+    parser.add_argument("--sample-every", type=int, metavar="SESSIONS",
+                        help="with --soak, sessions between samples (default: 20 samples per run)")
+    parser.add_argument("--startup", type=int, nargs="?", const=5, metavar="RUNS",
+                        help="measure import time and time to first frame in fresh interpreters")
+    parser.add_argument("--scores", default=SCORES_PATH, metavar="FILE",
+                        help="SQLite score database (default: %(default)s)")
+    parser.add_argument("--no-scores", action="store_true", help="do not save scores")
+    parser.add_argument("--leaderboard", action="store_true", help="print the top scores and exit")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for headless runs")
+    return parser
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
 
 # Run the game
 if __name__ == "__main__":
-    game = Game()
+    args = parse_args()
+    if args.bench_sim:
+        result = benchmark_simulation(args.bench_sim, args.seed)
+        print(f"{result['ticks']} ticks over {result['games']} games in {result['seconds']:.3f}s "
+              f"({result['ticks_per_second']:.0f} ticks/s)")
+        sys.exit()
+    if args.bench_draw:
+        result = benchmark_drawing(args.bench_draw, args.seed)
+        print(f"immediate: {result['immediate']:.3f} ms/frame, atlas: {result['atlas']:.3f} ms/frame")
+        sys.exit()
+    if args.bench_particles:
+        for draw in (False, True):
+            result = benchmark_particles(args.bench_particles, draw=draw)
+            label = "update+draw" if draw else "update"
+            print(f"{label}: " + ", ".join(f"{name} {ms:.3f} ms/frame" for name, ms in result.items()))
+        sys.exit()
+    if args.bench_present:
+        for (render_scale, (width, height)), (draw_ms, present_ms) in benchmark_present().items():
+            print(f"scale {render_scale:<4} {width}x{height}: draw {draw_ms:.3f} ms, present {present_ms:.3f} ms, "
+                  f"total {draw_ms + present_ms:.3f} ms")
+        sys.exit()
+    if args.bench_collisions:
+        for count, result in benchmark_collisions().items():
+            print(f"{count:>6} entities: list {result['list']:.3f} ms/tick, "
+                  f"store+grid {result['store']:.3f} ms/tick")
+        sys.exit()
+    if args.leaderboard:
+        store = ScoreStore(args.scores)
+        store.ready.wait()
+        for i, (name, score) in enumerate(store.top):
+            print(f"{i + 1:>3}. {name:<15} {score}")
+        store.close()
+        sys.exit()
+    if args.measure_latency:
+        for mode, result in measure_latency(args.measure_latency, args.draw_delay / 1000, args.seed).items():
+            print(f"{mode}: {result['ticks']} ticks, {result['frames']} frames")
+            for name in ('input_to_state', 'input_to_display'):
+                if result[name]:
+                    p50, p95, p99 = result[name]
+                    print(f"  {name.replace('_', ' '):<17} p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  p99 {p99:6.1f} ms")
+        sys.exit()
+    if args.soak:
+        report = run_soak(args.soak, args.session_seconds, args.sample_every, args.seed, args.tolerance)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"{report['sessions']} sessions, {report['frames']} frames in {report['seconds']:.0f}s")
+            print(f"{'session':>8} {'seconds':>8} " + " ".join(f"{metric:>10}" for metric in SOAK_METRICS))
+            for sample in report['samples']:
+                print(f"{sample['session']:>8.0f} {sample['seconds']:>8.0f} "
+                      + " ".join(f"{sample[metric]:>10.4g}" for metric in SOAK_METRICS))
+            for metric, (first, last) in report['growing'].items():
+                print(f"GROWING {metric}: {first:.4g} -> {last:.4g}, rising at every sample")
+            if report['top_allocators']:
+                print("Largest growth since the first sample (tracemalloc):")
+                for site, size in report['top_allocators'][:5]:
+                    print(f"  +{size / 1024:.1f} KB  {site}")
+            if not report['growing']:
+                print(f"No metric grew monotonically by more than {args.tolerance}%")
+        sys.exit(1 if report['growing'] else 0)
+    if args.startup:
+        result = measure_startup(args.startup)
+        print(f"import {result['import_ms']:.1f} ms, Game() {result['game_init_ms']:.1f} ms, "
+              f"first frame {result['first_frame_ms']:.1f} ms, "
+              f"time to first frame {result['time_to_first_frame_ms']:.1f} ms "
+              f"(whole process {result['process_ms']:.1f} ms, median of {args.startup})")
+        print("after import: " + ", ".join(f"{key} {value}" for key, value in result['side_effects'].items()))
+        sys.exit()
+    if args.bench_suite is not None:
+        unknown = set(args.bench_suite) - set(SUITE_SCENARIOS)
+        if unknown:
+            build_parser().error("unknown scenario: " + ", ".join(sorted(unknown)))
+        results = run_benchmark_suite(args.bench_suite, args.frames, args.seed)
+        for result in results.values():
+            rss = f"{result['peak_rss_kb']} KB" if result['peak_rss_kb'] else "n/a"
+            hit_rate = result['text_cache_hit_rate']
+            text = f"{hit_rate:6.1%}" if hit_rate is not None else "   n/a"
+            print(f"{result['scenario']:<16} {result['fps']:8.1f} fps  "
+                  f"{result['kept_blocks_per_frame']:8.2f} kept blocks/frame  "
+                  f"text cache hits {text}  peak RSS {rss}")
+        if args.save_baseline:
+            with open(args.save_baseline, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Baseline saved: {args.save_baseline}")
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            if regressions:
+                sys.exit(1)
+            print(f"No regressions beyond {args.tolerance}%")
+        sys.exit()
+    if args.replay:
+        replay = Replay.load(args.replay)
+        if args.seek is not None:
+            state = simulation_state(replay.seek(args.seek))
+            print(json.dumps(state, indent=2))
+            sys.exit()
+        start = time.perf_counter()
+        sim = replay.play()
+        elapsed = time.perf_counter() - start
+        matches = (sim.ticks, sim.score, sim.lives) == (replay.ticks, replay.score, replay.lives)
+        print(f"Replayed {sim.ticks} ticks in {elapsed:.3f}s ({sim.ticks / max(elapsed, 1e-9):.0f} ticks/s): "
+              f"score {sim.score}, lives {sim.lives} - "
+              + ("matches the recording" if matches else
+                 f"recording says {replay.ticks} ticks, score {replay.score}, lives {replay.lives}"))
+        sys.exit(0 if matches else 1)
+    if args.tournament:
+        start = time.perf_counter()
+        try:
+            summaries = run_tournament(args.tournament, args.policy.split(","), args.seed, args.processes)
+        except (ValueError, ImportError, AttributeError) as e:
+            build_parser().error(str(e))
+        elapsed = time.perf_counter() - start
+        if args.json:
+            print(json.dumps([summary.as_dict() for summary in summaries.values()], indent=2))
+        else:
+            for summary in summaries.values():
+                result = summary.as_dict()
+                print(f"{result['policy']}: {result['games']} games, score mean {result['score_mean']:.1f} "
+                      f"(median {result['score_median']}, {result['score_min']}-{result['score_max']}), "
+                      f"lives lost {result['lives_lost_mean']:.2f}/game, levels {result['levels']}")
+                print(f"  correct drops {result['correct_drops']}")
+                print(f"  wrong drops   {result['wrong_drops']}")
+                print(f"  missed trash  {result['missed_trash']}")
+            games = sum(summary.games for summary in summaries.values())
+            print(f"{games} games in {elapsed:.2f}s ({games / elapsed:.0f} games/s)")
+        sys.exit()
+    if args.bench_batch:
+        for n, rate in benchmark_batch(seed=args.seed).items():
+            print(f"{n:>5} games: {rate:.0f} game ticks/s")
+        sys.exit()
+    if args.bench_snapshots:
+        for swarm in (0, 100):
+            result = benchmark_snapshots(seed=args.seed, swarm=swarm)
+            print(f"{'swarm ' + str(swarm) if swarm else 'normal':<10} save {result['save_us']:.1f} us, "
+                  f"restore {result['restore_us']:.1f} us, deepcopy {result['deepcopy_us']:.1f} us, "
+                  f"up to {result['bytes']} bytes; {result['rollbacks']} rollbacks, "
+                  f"{result['mismatches']} mismatches")
+            if result['mismatches']:
+                sys.exit(1)
+        sys.exit()
+    if args.check_batch_parity:
+        mismatches = check_batch_parity(seed=args.seed)
+        for tick, seed, diff in mismatches[:10]:
+            print(f"tick {tick}, seed {seed}: {diff}")
+        print("Batch simulator matches the scalar rules" if not mismatches else
+              f"{len(mismatches)} mismatches")
+        sys.exit(1 if mismatches else 0)
+    game = Game(dirty_rects=args.dirty_rects, swarm=args.swarm, record=args.record, profile=args.profile,
+                scores=None if args.no_scores else args.scores, threaded=args.threaded,
+                quality=args.quality, fullscreen=args.fullscreen, smooth=args.smooth,
+                window=args.window, render_scale=args.render_scale)
     game.run()
\ No newline at end of file